@@ -1,11 +1,16 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from fetchai.crypto import Identity
 from fetchai.registration import register_with_agentverse
 from fetchai.communication import parse_message_from_agent, send_message_to_agent
 from fetchai import fetch
+import json
 import logging
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 logging.basicConfig(level=logging.DEBUG)
@@ -14,14 +19,188 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {'origins': 'http://localhost:5174'}})
 
+class ResponseStore:
+    """Responses keyed by request ID, bounded in size and age.
+
+    An ID is registered when its request is sent; the webhook fills it in
+    and the client collects it once. Entries older than ``ttl_seconds``
+    (answered or not) expire, and the oldest are dropped beyond
+    ``max_entries``. ``wait`` blocks until a response arrives, so it can be
+    pushed to the client as soon as the webhook stores it.
+    """
+
+    def __init__(self, ttl_seconds=600, max_entries=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # request_id -> [response or None while pending, created_at]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._entries:
+            request_id, (_, created_at) = next(iter(self._entries.items()))
+            if now - created_at <= self.ttl_seconds and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[request_id]
+
+    def register(self, request_id):
+        with self._lock:
+            self._entries[request_id] = [None, time.monotonic()]
+            self._expire()
+
+    def put(self, request_id, response):
+        """Store a response; False if the ID is unknown or already expired."""
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(request_id)
+            if entry is None:
+                return False
+            entry[0] = response
+            self._arrived.notify_all()
+            return True
+
+    def discard(self, request_id):
+        """Forget a request that will never be answered (e.g. it could not be sent)."""
+        with self._lock:
+            self._entries.pop(request_id, None)
+            self._arrived.notify_all()
+
+    def _pop(self, request_id):
+        self._expire()
+        entry = self._entries.get(request_id)
+        if entry is None:
+            return "unknown", None
+        if entry[0] is None:
+            return "waiting", None
+        del self._entries[request_id]
+        return "ready", entry[0]
+
+    def pop(self, request_id):
+        """("ready", response), ("waiting", None) or ("unknown", None)."""
+        with self._lock:
+            return self._pop(request_id)
+
+    def wait(self, request_id, timeout):
+        """Like ``pop``, but waits up to ``timeout`` seconds for the response."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                status, response = self._pop(request_id)
+                remaining = deadline - time.monotonic()
+                if status != "waiting" or remaining <= 0:
+                    return status, response
+                self._arrived.wait(remaining)
+
+class LocalRegistry:
+    """Offline stand-in for ``fetch.ai`` search, answering with fixed agent addresses.
+
+    Enabled with ``AGENT_REGISTRY=local``; addresses come from
+    ``FINANCIAL_AGENT_ADDRESS`` (comma-separated for several agents).
+    """
+
+    def __init__(self, addresses):
+        self.addresses = [address for address in addresses if address]
+        self.searches = 0
+
+    def ai(self, query):
+        self.searches += 1
+        return {"ais": [{"address": address, "name": query} for address in self.addresses]}
+
+class AgentDirectory:
+    """Cached agent discovery.
+
+    The registry is searched at most once per ``ttl_seconds``. Within
+    ``refresh_seconds`` of expiry the cached agent is still returned while
+    a background thread refreshes it, so requests only wait on the
+    registry when nothing usable is cached; concurrent requests then share
+    one lookup. ``invalidate`` drops the entry, e.g. after a send to the
+    cached address fails.
+    """
+
+    def __init__(self, registry, query, ttl_seconds=300, refresh_seconds=60):
+        self.registry = registry
+        self.query = query
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self._agent = None
+        self._found_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        # Held for the duration of a registry lookup
+        self._search_lock = threading.Lock()
+        self._searched_at = float("-inf")
+
+    def _fresh(self):
+        with self._lock:
+            if self._agent is not None and time.monotonic() - self._found_at < self.ttl_seconds:
+                return self._agent
+        return None
+
+    def _search(self):
+        requested = time.monotonic()
+        with self._search_lock:
+            # A lookup that finished while this request waited answers it too
+            if self._searched_at >= requested:
+                return self._fresh()
+            return self._lookup()
+
+    def _lookup(self):
+        try:
+            agents = self.registry.ai(self.query).get('ais', [])
+        finally:
+            self._searched_at = time.monotonic()
+        agent = agents[0] if agents else None
+        with self._lock:
+            if agent is not None:
+                self._agent, self._found_at = agent, time.monotonic()
+        if agent is not None:
+            logger.info(f"Found financial agent at address: {agent['address']}")
+        return agent
+
+    def _refresh(self):
+        try:
+            with self._search_lock:
+                self._lookup()
+        except Exception as e:
+            logger.warning(f"Background agent refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self):
+        with self._lock:
+            agent = self._agent
+            age = time.monotonic() - self._found_at
+            if agent is not None and age < self.ttl_seconds:
+                if age >= self.ttl_seconds - self.refresh_seconds and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, name="agent-refresh", daemon=True).start()
+                return agent
+        return self._search()
+
+    def invalidate(self):
+        with self._lock:
+            self._agent = None
+
+def create_registry():
+    if os.getenv("AGENT_REGISTRY") == "local":
+        return LocalRegistry(os.getenv("FINANCIAL_AGENT_ADDRESS", "").split(","))
+    return fetch
+
 class PrimaryAgent:
     def __init__(self):
         self.identity = None
-        self.latest_response = None
+        # Created in initialize(), once .env is loaded
+        self.directory = None
+        # Responses per request, so concurrent users never see each other's answers
+        self.responses = ResponseStore()
     
     def initialize(self):
         try:
             self.identity = Identity.from_seed(os.getenv("PRIMARY_AGENT_KEY"), 0)
+            self.directory = AgentDirectory(create_registry(), "Financial Analysis Agent")
             
             register_with_agentverse(
                 identity=self.identity,
@@ -31,26 +210,39 @@ class PrimaryAgent:
                 readme="<description>Routes queries to Financial Analysis Agent</description>"
             )
             logger.info("Primary agent initialized successfully!")
+            # Warm the discovery cache so the first user request skips the search
+            self.find_financial_agent()
                 
         except Exception as e:
             logger.error(f"Initialization error: {e}")
             raise
 
     def find_financial_agent(self):
-        """Find our registered financial analysis agent"""
+        """Find our registered financial analysis agent (cached, see AgentDirectory)"""
         try:
-            available_ais = fetch.ai("Financial Analysis Agent")
-            agents = available_ais.get('ais', [])
-            
-            if agents:
-                logger.info(f"Found financial agent at address: {agents[0]['address']}")  # Add this log
-                return agents[0]
-            return None
+            return self.directory.get()
             
         except Exception as e:
             logger.error(f"Error finding financial agent: {e}")
             return None
 
+    def send_to_financial_agent(self, payload):
+        """Send to the cached agent; if that fails, look the agent up again and retry once"""
+        for attempt in range(2):
+            agent = self.find_financial_agent()
+            if not agent:
+                return None
+            logger.info(f"Sending request to agent at: {agent['address']}")  # Add this log
+            try:
+                send_message_to_agent(self.identity, agent['address'], payload)
+                return agent
+            except Exception as e:
+                # The cached address may be stale
+                self.directory.invalidate()
+                if attempt:
+                    raise
+                logger.warning(f"Send to {agent['address']} failed ({e}); rediscovering the agent")
+
 primary_agent = PrimaryAgent()
 
 @app.route('/api/send-request', methods=['POST'])
@@ -62,22 +254,24 @@ def send_request():
         if not user_input:
             return jsonify({"error": "No input provided"}), 400
         
-        # Find financial analysis agent
-        agent = primary_agent.find_financial_agent()
+        # The agent echoes request_id back with its answer; registered before
+        # sending so a fast reply is never dropped as unknown
+        request_id = uuid.uuid4().hex
+        primary_agent.responses.register(request_id)
+        # Send request to financial analysis agent
+        try:
+            agent = primary_agent.send_to_financial_agent({
+                "request": user_input,
+                "request_id": request_id
+            })
+        except Exception:
+            primary_agent.responses.discard(request_id)
+            raise
         if not agent:
+            primary_agent.responses.discard(request_id)
             return jsonify({"error": "Financial analysis agent not available"}), 404
         
-        logger.info(f"Sending request to agent at: {agent['address']}")  # Add this log
-        # Send request to financial agent
-        send_message_to_agent(
-            primary_agent.identity,
-            agent['address'],
-            {
-                "request": user_input
-            }
-        )
-        
-        return jsonify({"status": "request_sent"})
+        return jsonify({"status": "request_sent", "request_id": request_id})
         
     except Exception as e:
         logger.error(f"Error processing request: {e}")
@@ -86,23 +280,62 @@ def send_request():
 @app.route('/api/get-response', methods=['GET'])
 def get_response():
     try:
-        if primary_agent.latest_response:
-            response = primary_agent.latest_response
-            primary_agent.latest_response = None
+        request_id = request.args.get('request_id')
+        if not request_id:
+            return jsonify({"error": "No request_id provided"}), 400
+
+        status, response = primary_agent.responses.pop(request_id)
+        if status == "ready":
             return jsonify(response)
+        if status == "unknown":
+            return jsonify({"error": "Unknown or expired request_id"}), 404
         return jsonify({"status": "waiting"})
     except Exception as e:
         logger.error(f"Error getting response: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Seconds between keepalive events while a request is pending, so proxies do not close the stream
+EVENT_KEEPALIVE_INTERVAL = 10
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/events/<request_id>', methods=['GET'])
+def response_events(request_id):
+    """Server-Sent Events for one request: ``keepalive`` events while it is pending, then ``result`` or ``failure``.
+
+    The financial agent only replies once, with the finished analysis, so
+    keepalives carry the time waited so far, not the agent's progress.
+    """
+    def generate():
+        started = time.monotonic()
+        while True:
+            status, response = primary_agent.responses.wait(request_id, EVENT_KEEPALIVE_INTERVAL)
+            if status == "ready":
+                yield sse("result", response)
+                return
+            if status == "unknown":
+                yield sse("failure", {"error": "Unknown or expired request_id"})
+                return
+            yield sse("keepalive", {"elapsed": round(time.monotonic() - started)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     try:
         data = request.get_data().decode("utf-8")
         message = parse_message_from_agent(data)
         
-        # Store response
-        primary_agent.latest_response = message.payload
+        # Store response under the request it answers
+        request_id = message.payload.get("request_id")
+        if not primary_agent.responses.put(request_id, message.payload):
+            logger.warning(f"Dropping response for unknown or expired request {request_id}")
+            return jsonify({"status": "ignored"})
         
         return jsonify({"status": "success"})
         
@@ -0,0 +1,285 @@
+"""End-to-end benchmark of ingestion, retrieval, RAG and the research graph, fully offline.
+
+The OpenAI chat model and embeddings and Tavily are replaced by the
+deterministic stand-ins in ``benchmarks.fakes``, each with an injected
+per-call latency, so runs need no network access or API keys and are
+comparable across commits (made with the same parameters). Token counting
+uses tiktoken's ``cl100k_base`` when its BPE file is cached (or can be
+downloaded) and otherwise ``LocalEncoding``; ``--tokenizer`` forces either,
+and the results record which one ran. Reports per-stage timings,
+throughput of the async graph under concurrency (with and without SQLite
+checkpoints), checkpoint resume after injected model failures, throughput
+of the batch API, and peak memory, and saves the results as JSON under ``benchmarks/results``.
+
+Run from the repository root with::
+
+    PYTHONPATH=financial-analysis-agent python -m benchmarks.bench_pipeline [--compare benchmarks/results/<old>.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, fake_tavily, local_tokenizer, tiktoken_available
+from src.graph.batch import abatch_research
+from src.graph.checkpoint import create_checkpointer
+from src.graph.state import ainvoke_research, create_research_graph, invoke_research
+from src.rag.chain import create_rag_chain
+from src.rag.embeddings import CachedEmbeddings
+from src.utils.metrics import MetricsCallbackHandler
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+QUESTIONS = [
+    "What is Apple's total revenue?",
+    "What are the main risk factors?",
+    "How much was spent on R&D?",
+    "What was the gross margin percentage?",
+    "How much cash and marketable securities does Apple hold?",
+    "What were net sales by product category?",
+    "How many shares were repurchased during the year?",
+    "What legal proceedings does Apple disclose?",
+]
+
+
+def max_rss_mb():
+    # Linux reports kilobytes
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@contextmanager
+def measure(results, stage, trace_memory=False):
+    """Record wall time and peak memory of the block under ``results[stage]``.
+
+    ``max_rss_mb`` is the process's peak RSS so far. ``trace_memory`` adds
+    the block's own peak Python allocations (``peak_mb``) via tracemalloc,
+    which slows Python-heavy stages several times over.
+    """
+    entry = results.setdefault(stage, {})
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry["seconds"] = round(time.perf_counter() - started, 4)
+        entry["max_rss_mb"] = max_rss_mb()
+        if trace_memory:
+            entry["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.stop()
+
+
+def latency_stats(samples):
+    samples = sorted(samples)
+    return {
+        "calls": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+        "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 2),
+    }
+
+
+async def run_concurrent(chain, questions, concurrency, prefix="bench"):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i, question):
+        async with semaphore:
+            # A fresh request ID per run so checkpoints are never replayed
+            return await ainvoke_research(chain, question, f"{prefix}-{concurrency}-{i}")
+
+    return await asyncio.gather(*[one(i, question) for i, question in enumerate(questions)])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args):
+    stages = {}
+    llm = FakeChatModel(latency=args.llm_latency)
+    embeddings = FakeEmbeddings(latency=args.embedding_latency)
+    trace = args.trace_memory
+    questions = QUESTIONS * args.rounds
+
+    with tempfile.TemporaryDirectory() as persist_dir, fake_tavily(args.search_latency):
+        # As in production: chunk vectors cached on disk, query vectors in memory
+        cached = CachedEmbeddings(embeddings, os.path.join(persist_dir, "embedding_cache.sqlite"))
+        # 1. Ingestion: cold build, then a restart that loads the persisted index
+        with measure(stages, "ingest_cold", trace) as entry:
+            create_rag_chain(args.filing, persist_dir=persist_dir, embedding_model=cached, llm=llm, vector_backend=args.vector_backend)
+            entry["embedding_calls"] = embeddings.calls
+        with measure(stages, "ingest_warm", trace):
+            chain = create_rag_chain(args.filing, persist_dir=persist_dir, embedding_model=cached, llm=llm, vector_backend=args.vector_backend)
+
+        # 2. Retrieval and 3. single RAG calls, split by the metrics callbacks
+        retrieval, calls = [], []
+        with measure(stages, "rag_call", trace) as entry:
+            for question in questions:
+                handler = MetricsCallbackHandler()
+                started = time.perf_counter()
+                chain.invoke(question, config={"callbacks": [handler]})
+                calls.append(time.perf_counter() - started)
+                retrieval.append(handler.retrieval_seconds)
+            entry.update(latency_stats(calls))
+        stages["retrieval"] = latency_stats(retrieval)
+
+        # 4. Full graph runs, one at a time
+        graph = create_research_graph(chain, parallel=True, llm=llm)
+        node_seconds = {}
+        with measure(stages, "graph_run", trace) as entry:
+            runs = []
+            for i, question in enumerate(questions):
+                handler = MetricsCallbackHandler()
+                started = time.perf_counter()
+                invoke_research(graph, question, f"bench-serial-{i}", config={"callbacks": [handler]})
+                runs.append(time.perf_counter() - started)
+                for node, seconds in handler.summary()["node_seconds"].items():
+                    node_seconds.setdefault(node, []).append(seconds)
+            entry.update(latency_stats(runs))
+            entry["node_mean_ms"] = {node: round(statistics.fmean(s) * 1000, 2) for node, s in node_seconds.items()}
+
+        # 5. Throughput of the async graph at increasing concurrency
+        stages["throughput"] = {}
+        for concurrency in args.concurrency:
+            # Enough runs to keep every slot busy twice over
+            batch = [QUESTIONS[i % len(QUESTIONS)] for i in range(max(concurrency * 2, len(QUESTIONS)))]
+            with measure(stages["throughput"], str(concurrency), trace) as entry:
+                asyncio.run(run_concurrent(graph, batch, concurrency))
+            entry["runs"] = len(batch)
+            entry["runs_per_second"] = round(len(batch) / entry["seconds"], 2)
+
+        # 5b. The same with runs checkpointed to SQLite, as in production
+        checkpointed = create_research_graph(
+            chain, parallel=True, llm=llm, checkpointer=create_checkpointer(os.path.join(persist_dir, "checkpoints.sqlite"))
+        )
+        with measure(stages, "graph_run_checkpointed", trace) as entry:
+            runs = []
+            for i, question in enumerate(questions):
+                started = time.perf_counter()
+                invoke_research(checkpointed, question, f"bench-checkpointed-{i}")
+                runs.append(time.perf_counter() - started)
+            entry.update(latency_stats(runs))
+        concurrency = max(args.concurrency)
+        batch = [QUESTIONS[i % len(QUESTIONS)] for i in range(max(concurrency * 2, len(QUESTIONS)))]
+        with measure(stages, "throughput_checkpointed", trace) as entry:
+            asyncio.run(run_concurrent(checkpointed, batch, concurrency, prefix="checkpointed"))
+        entry["concurrency"] = concurrency
+        entry["runs"] = len(batch)
+        entry["runs_per_second"] = round(len(batch) / entry["seconds"], 2)
+
+        # 5c. Checkpoint resume: a flaky model fails every n-th call and each run retries from its checkpoint
+        flaky = FakeChatModel(latency=args.llm_latency, fail_every=args.fail_every)
+        resuming = create_research_graph(chain, parallel=True, llm=flaky, checkpointer=checkpointed.checkpointer)
+        with measure(stages, "resume", trace) as entry:
+            runs = []
+            for i, question in enumerate(questions):
+                started = time.perf_counter()
+                invoke_research(resuming, question, f"bench-resume-{i}", retries=3)
+                runs.append(time.perf_counter() - started)
+            entry.update(latency_stats(runs))
+        entry["llm_calls"] = flaky.calls
+        entry["failures"] = flaky.calls // args.fail_every
+
+        # 6. A questionnaire through the batch API (repeats included, as analysts send them),
+        # worded anew so its sub-queries are not already in the query cache
+        questionnaire = [f"For the questionnaire: {question}" for question in QUESTIONS] * 3
+        calls_before, waves_before = embeddings.calls, cached.query_waves
+        with measure(stages, "batch", trace) as entry:
+            asyncio.run(abatch_research(graph, questionnaire, max_concurrency=max(args.concurrency), embedding_model=cached))
+        entry["embedding_calls"] = embeddings.calls - calls_before
+        entry["embedding_waves"] = cached.query_waves - waves_before
+        entry["questions"] = len(questionnaire)
+        entry["questions_per_second"] = round(len(questionnaire) / entry["seconds"], 2)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {
+            "filing": args.filing,
+            "vector_backend": args.vector_backend,
+            "llm_latency": args.llm_latency,
+            "embedding_latency": args.embedding_latency,
+            "search_latency": args.search_latency,
+            "rounds": args.rounds,
+            "fail_every": args.fail_every,
+            "tokenizer": args.tokenizer,
+            "trace_memory": trace,
+        },
+        "stages": stages,
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+def _flatten(stages, prefix=""):
+    for name, value in stages.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{name}.")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{name}", value
+
+
+def compare(current, previous):
+    """Print every numeric metric next to the previous run's value."""
+    before = dict(_flatten(previous["stages"]))
+    print(f"\n{'metric':45} {previous['commit']:>12} {current['commit']:>12}  change")
+    for name, value in _flatten(current["stages"]):
+        if name in before:
+            change = f"{(value - before[name]) / before[name] * 100:+.1f}%" if before[name] else ""
+            print(f"{name:45} {before[name]:>12} {value:>12}  {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filing", default="data/raw/apple_10k.pdf")
+    parser.add_argument("--vector-backend", default="quantized")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--search-latency", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, default=1, help="times each question is asked per stage")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--fail-every", type=int, default=10, help="the resume stage's model fails every n-th call")
+    parser.add_argument(
+        "--tokenizer", choices=["auto", "tiktoken", "local"], default="auto",
+        help="tiktoken needs the cl100k_base BPE cached or downloadable; auto falls back to local",
+    )
+    parser.add_argument("--trace-memory", action="store_true", help="also report per-stage peak Python allocations (slower)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--output", help="where to save results (default: benchmarks/results/)")
+    args = parser.parse_args(argv)
+
+    if args.tokenizer == "auto":
+        args.tokenizer = "tiktoken" if tiktoken_available() else "local"
+        if args.tokenizer == "local":
+            print("cl100k_base BPE not available offline; counting tokens with LocalEncoding", file=sys.stderr)
+    with local_tokenizer() if args.tokenizer == "local" else nullcontext():
+        results = run(args)
+    print(json.dumps(results, indent=2))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Micro-benchmark: token-aware splitter vs. the per-call tiktoken splitter.
+
+Run with ``python -m benchmarks.bench_splitter [path/to/filing.pdf]``.
+"""
+import sys
+import time
+
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_community.document_loaders import PyMuPDFLoader
+
+from src.rag.splitter import TokenAwareTextSplitter, TokenCounter
+
+
+def naive_tiktoken_len(text):
+    # What DocumentLoader.tiktoken_len used to do on every length check
+    return len(tiktoken.encoding_for_model("gpt-4").encode(text))
+
+
+def time_split(splitter, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        if isinstance(splitter, TokenAwareTextSplitter):
+            splitter.counter.clear()
+        started = time.perf_counter()
+        chunks = splitter.split_documents(docs)
+        best = min(best, time.perf_counter() - started)
+    return best, chunks
+
+
+def main(file_path="data/raw/apple_10k.pdf", repeat=3):
+    docs = PyMuPDFLoader(file_path).load()
+    baseline = RecursiveCharacterTextSplitter(
+        chunk_size=300, chunk_overlap=0, length_function=naive_tiktoken_len
+    )
+    fast = TokenAwareTextSplitter(counter=TokenCounter("gpt-4"), chunk_size=300, chunk_overlap=0)
+
+    calls = 0
+
+    def counting_len(text):
+        nonlocal calls
+        calls += 1
+        return naive_tiktoken_len(text)
+
+    RecursiveCharacterTextSplitter(
+        chunk_size=300, chunk_overlap=0, length_function=counting_len
+    ).split_documents(docs)
+
+    baseline_time, expected = time_split(baseline, docs, repeat)
+    fast_time, actual = time_split(fast, docs, repeat)
+
+    assert [c.page_content for c in actual] == [c.page_content for c in expected], "chunk mismatch"
+    print(f"pages={len(docs)} chunks={len(expected)} length_calls={calls}")
+    print(f"baseline     {baseline_time * 1000:8.1f} ms")
+    print(f"token-aware  {fast_time * 1000:8.1f} ms  ({baseline_time / fast_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,255 @@
+"""Deterministic local stand-ins for the OpenAI chat model, OpenAI embeddings, Tavily and tiktoken.
+
+Each takes an injected ``latency`` (seconds per call) so benchmarks measure
+the pipeline's own overhead plus a realistic, fixed amount of waiting.
+"""
+import asyncio
+import contextlib
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, FunctionMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import tiktoken
+
+from src.graph.state import WORKERS
+from src.rag.embeddings import HashEmbeddings
+from src.rag.splitter import get_encoder
+from src.tools import search
+
+
+def _words(messages: List[BaseMessage]) -> int:
+    return sum(len(str(message.content).split()) for message in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers from its input instead of calling an API.
+
+    With the supervisor's ``route`` function bound it sends the question to
+    ALL workers (or each worker in turn) and FINISHes once every worker has
+    answered. With agent tools bound it calls the first tool once, then
+    answers from the tool output. Otherwise (the RAG prompt) it answers
+    with the start of the prompt. Token usage is reported as word counts.
+    With ``fail_every`` set, every n-th call raises ConnectionError, like a
+    flaky provider, to exercise checkpoint resume.
+    """
+
+    latency: float = 0.0
+    answer_words: int = 60
+    fail_every: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_functions(self, functions, function_call=None, **kwargs):
+        return self.bind(functions=functions, function_call={"name": function_call} if function_call else None)
+
+    def _route(self, messages: List[BaseMessage], functions: List[Dict]) -> AIMessage:
+        answered = {getattr(message, "name", None) for message in messages}
+        pending = [worker for worker in WORKERS if worker not in answered]
+        if not pending:
+            next_ = "FINISH"
+        elif len(pending) == len(WORKERS) and "ALL" in json.dumps(functions):
+            next_ = "ALL"
+        else:
+            next_ = pending[0]
+        arguments = {"next": next_, "reasoning": "benchmark route", "information_needed": []}
+        return AIMessage(content="", additional_kwargs={"function_call": {"name": "route", "arguments": json.dumps(arguments)}})
+
+    def _respond(self, messages: List[BaseMessage], functions: Optional[List[Dict]] = None, **kwargs) -> AIMessage:
+        names = [function["name"] for function in functions or []]
+        if "route" in names:
+            return self._route(messages, functions)
+        if names and not any(isinstance(message, FunctionMessage) for message in messages):
+            query = re.sub(r"\s+", " ", str(messages[-1].content))[-200:]
+            return AIMessage(content="", additional_kwargs={"function_call": {"name": names[0], "arguments": json.dumps({"query": query})}})
+        source = " ".join(str(messages[-1].content).split()[: self.answer_words])
+        return AIMessage(content=f"Answer: {source}")
+
+    def _call(self):
+        self.calls += 1
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise ConnectionError("fake provider unavailable")
+
+    def _result(self, messages: List[BaseMessage], message: AIMessage) -> ChatResult:
+        usage = {"prompt_tokens": _words(messages), "completion_tokens": len(message.content.split())}
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._call()
+        time.sleep(self.latency)
+        return self._result(messages, self._respond(messages, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._call()
+        await asyncio.sleep(self.latency)
+        return self._result(messages, self._respond(messages, **kwargs))
+
+    @staticmethod
+    def _chunks(message: AIMessage):
+        if not message.content:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", additional_kwargs=message.additional_kwargs))
+            return
+        for word in message.content.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._call()
+        time.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            if run_manager and chunk.text:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Without this, async streaming calls fall back to _stream on a thread
+        self._call()
+        await asyncio.sleep(self.latency)
+        for chunk in self._chunks(self._respond(messages, **kwargs)):
+            if run_manager and chunk.text:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeEmbeddings(HashEmbeddings):
+    """HashEmbeddings with a fixed delay per request, like a remote embedding API."""
+
+    def __init__(self, size: int = 1536, latency: float = 0.0):
+        super().__init__(size)
+        self.latency = latency
+        self.model = f"fake-embeddings-{size}"
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def _search_response(query: str, max_results: int = 5) -> Dict[str, Any]:
+    words = re.findall(r"\w+", query.lower())[:6] or ["market"]
+    return {
+        "query": query,
+        "results": [
+            {
+                "title": f"{' '.join(words).title()} - report {i}",
+                "url": f"https://example.com/{'-'.join(words)}/{i}",
+                "published_date": "2024-01-0%d" % (i + 1),
+                "content": " ".join(words * 40),
+                "score": 1.0 - i / 10,
+            }
+            for i in range(max_results)
+        ],
+    }
+
+
+class FakeTavilyClient:
+    """Sync and async Tavily ``search`` returning synthetic results after ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return _search_response(query, max_results)
+
+
+class FakeAsyncTavilyClient(FakeTavilyClient):
+    async def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return _search_response(query, max_results)
+
+
+@contextlib.contextmanager
+def fake_tavily(latency: float = 0.0):
+    """Route the Search tool to FakeTavilyClient for the duration of the block.
+
+    The search result cache is cleared on entry and exit so every run pays
+    for its searches.
+    """
+    sync_client, async_client = FakeTavilyClient(latency), FakeAsyncTavilyClient(latency)
+    saved = search.tavily_client, search.get_async_tavily_client
+    search.tavily_client = sync_client
+    search.get_async_tavily_client = lambda: async_client
+    search.search_cache.clear()
+    try:
+        yield sync_client, async_client
+    finally:
+        search.tavily_client, search.get_async_tavily_client = saved
+        search.search_cache.clear()
+
+
+class LocalEncoding:
+    """Offline stand-in for tiktoken's ``cl100k_base``: one token per word, number or punctuation run.
+
+    Needs no BPE download. Like ``cl100k_base`` on English prose it yields
+    about one token per word, but rare long words stay whole and numbers
+    split into groups of three, so chunk boundaries differ somewhat from
+    production. ``decode`` inverts ``encode``.
+    """
+
+    name = "local-words"
+    _PIECES = re.compile(r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+|_+")
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._pieces: List[str] = []
+        self._lock = threading.Lock()
+
+    def encode(self, text: str, **kwargs) -> List[int]:
+        tokens = []
+        for piece in self._PIECES.findall(text):
+            token = self._ids.get(piece)
+            if token is None:
+                with self._lock:
+                    token = self._ids.setdefault(piece, len(self._pieces))
+                    if token == len(self._pieces):
+                        self._pieces.append(piece)
+            tokens.append(token)
+        return tokens
+
+    def decode(self, tokens: List[int]) -> str:
+        return "".join(self._pieces[token] for token in tokens)
+
+
+def tiktoken_available(model: str = "gpt-4") -> bool:
+    """Whether the model's BPE loads, i.e. is cached locally or can be downloaded."""
+    try:
+        tiktoken.encoding_for_model(model)
+        return True
+    except Exception:
+        return False
+
+
+@contextlib.contextmanager
+def local_tokenizer():
+    """Serve every ``get_encoder`` call from one LocalEncoding for the duration of the block."""
+    encoding = LocalEncoding()
+    saved = tiktoken.encoding_for_model
+    tiktoken.encoding_for_model = lambda model: encoding
+    get_encoder.cache_clear()
+    try:
+        yield encoding
+    finally:
+        tiktoken.encoding_for_model = saved
+        get_encoder.cache_clear()
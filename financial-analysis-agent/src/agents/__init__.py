@@ -1,5 +1,6 @@
 from .search_agent import create_search_agent
 from .sec_agent import create_sec_agent
 from .supervisor import create_supervisor_agent
+from .router import FastRouter
 
-__all__ = ['create_search_agent', 'create_sec_agent','create_supervisor_agent']
\ No newline at end of file
+__all__ = ['create_search_agent', 'create_sec_agent','create_supervisor_agent', 'FastRouter']
\ No newline at end of file
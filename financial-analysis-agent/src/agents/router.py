@@ -0,0 +1,206 @@
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+
+# Phrases that pin a question to one worker's source
+SOURCE_PATTERNS = {
+    "SECAnalyst": re.compile(
+        r"\b(?:10-?k|10-?q|sec filings?|filings?|annual report|fiscal (?:year )?\d{4}|fy ?\d{2,4}"
+        r"|risk factors?|md&a|balance sheet|income statement|cash flow statement|r&d|research and development"
+        r"|net sales|revenue|gross margin|operating (?:income|margin)|net income|earnings per share|eps"
+        r"|segment|item \d{1,2}[a-c]?|legal proceedings|share repurchases?|dividends? declared)\b",
+        re.I,
+    ),
+    "Search": re.compile(
+        r"\b(?:today|current(?:ly)?|latest|recent(?:ly)?|this (?:week|month|quarter)|news|stock price"
+        r"|share price|trading|market cap(?:italization)?|analysts?|consensus|price target|rating|outlook"
+        r"|forecast|guidance|competitors?|versus|vs\.?|compared? (?:to|with) (?:peers|competitors)"
+        r"|industry trends?|rumou?rs?|announce(?:d|ment)?)\b",
+        re.I,
+    ),
+}
+
+# Phrases in a worker's answer showing it could not cover the question
+_GAP = re.compile(
+    r"\b(?:could not find|couldn't find|unable to|not available|no information|not (?:included|disclosed) in"
+    r"|would need|need (?:more|additional)|recommend (?:checking|consulting))\b",
+    re.I,
+)
+_CONTEXT_NEEDED = re.compile(r"Additional Context Needed:?\**\s*(.*?)(?=\n\s*\**\d\.|\Z)", re.I | re.S)
+_NOTHING = re.compile(r"^[\s\[\(]*(?:none|n/?a|not applicable|no additional context(?: needed)?|if any)?[\s\]\).]*$", re.I)
+
+
+def answer_covers_query(content: str) -> bool:
+    """True when a worker's answer reports no gaps and asks for no further context."""
+    if not content.strip() or _GAP.search(content):
+        return False
+    needed = _CONTEXT_NEEDED.search(content)
+    return needed is None or bool(_NOTHING.match(needed.group(1)))
+
+
+class FastRouter:
+    """Local routing stage run before the LLM supervisor.
+
+    The first step routes on source keywords: a question only one worker's
+    source can answer goes straight to it; one needing both goes to ALL
+    when the graph runs workers in parallel. Questions the keywords cannot
+    place are matched against earlier supervisor decisions by embedding
+    similarity. After the workers a question needs have answered without
+    reporting gaps, the router emits FINISH itself. Everything else falls
+    back to the LLM supervisor, whose first-step decisions are remembered.
+    """
+
+    def __init__(
+        self,
+        members: List[str],
+        allow_parallel: bool = False,
+        embedding_model: Optional[Embeddings] = None,
+        threshold: float = 0.9,
+        max_examples: int = 500,
+    ):
+        self.members = members
+        self.allow_parallel = allow_parallel
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.max_examples = max_examples
+        self._routes: List[str] = []
+        self._vectors = None
+        self._lock = threading.Lock()
+        self.fast_routes = 0
+        self.fast_finishes = 0
+        self.llm_calls = 0
+
+    def sources(self, query: str) -> List[str]:
+        """Workers whose source the query clearly needs, in member order."""
+        return [
+            member for member in self.members
+            if member in SOURCE_PATTERNS and SOURCE_PATTERNS[member].search(query)
+        ]
+
+    def _route_for(self, sources: List[str]) -> Optional[str]:
+        if len(sources) == 1:
+            return sources[0]
+        if len(sources) > 1 and self.allow_parallel:
+            return "ALL"
+        return None
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if self.embedding_model is None:
+            return None
+        return self._unit(self.embedding_model.embed_query(query))
+
+    def _nearest(self, vector: Optional[np.ndarray]) -> Optional[str]:
+        with self._lock:
+            if vector is None or self._vectors is None:
+                return None
+            similarities = self._vectors @ vector
+            best = int(np.argmax(similarities))
+            return self._routes[best] if similarities[best] >= self.threshold else None
+
+    def learn(self, query: str, route: str, vector: Optional[np.ndarray] = None):
+        """Remember a supervisor's first-step decision for similar future questions."""
+        if route not in self.members and route != "ALL":
+            return
+        vector = self._embed(query) if vector is None else vector
+        if vector is None:
+            return
+        with self._lock:
+            self._routes.append(route)
+            rows = vector[None, :] if self._vectors is None else np.vstack([self._vectors, vector])
+            self._vectors = rows[-self.max_examples:]
+            self._routes = self._routes[-self.max_examples:]
+
+    @staticmethod
+    def _query(messages: List[BaseMessage]) -> str:
+        return messages[0].content if messages else ""
+
+    def _finished(self, state: Dict) -> bool:
+        messages = state["messages"]
+        needed = self.sources(self._query(messages))
+        if not needed:
+            return False
+        latest = {}
+        for message in messages[1:]:
+            if getattr(message, "name", None) in self.members:
+                latest[message.name] = message.content
+        return all(name in latest and answer_covers_query(latest[name]) for name in needed)
+
+    def _first_step(self, state: Dict) -> bool:
+        return not any(getattr(message, "name", None) in self.members for message in state["messages"][1:])
+
+    def decide(self, state: Dict) -> Optional[Dict]:
+        """A keyword routing or FINISH decision, or None when the router is unsure."""
+        if not self._first_step(state):
+            if self._finished(state):
+                self.fast_finishes += 1
+                return {"next": "FINISH", "reasoning": "Workers answered the question in full", "information_needed": []}
+            return None
+        route = self._route_for(self.sources(self._query(state["messages"])))
+        return self._fast_route(route, "Routed locally on the question's sources")
+
+    def recall(self, vector: Optional[np.ndarray]) -> Optional[Dict]:
+        """Reuse the route of the most similar earlier question, if close enough."""
+        return self._fast_route(self._nearest(vector), "Routed like a similar earlier question")
+
+    def _fast_route(self, route: Optional[str], reasoning: str) -> Optional[Dict]:
+        if route is None:
+            return None
+        self.fast_routes += 1
+        return {"next": route, "reasoning": reasoning, "information_needed": []}
+
+    def stats(self) -> dict:
+        return {
+            "fast_routes": self.fast_routes,
+            "fast_finishes": self.fast_finishes,
+            "llm_calls": self.llm_calls,
+            "examples": len(self._routes),
+        }
+
+    def wrap(self, supervisor: Runnable) -> Runnable:
+        """Supervisor node that tries the fast path first."""
+
+        def route(state, config):
+            decision = self.decide(state)
+            if decision is not None:
+                return decision
+            first_step = self._first_step(state)
+            # Only embed once the keywords could not place the question
+            vector = self._embed(self._query(state["messages"])) if first_step else None
+            decision = self.recall(vector)
+            if decision is not None:
+                return decision
+            self.llm_calls += 1
+            decision = supervisor.invoke(state, config=config)
+            if first_step:
+                self.learn(self._query(state["messages"]), decision.get("next"), vector)
+            return decision
+
+        async def aroute(state, config):
+            decision = self.decide(state)
+            if decision is not None:
+                return decision
+            first_step = self._first_step(state)
+            vector = None
+            if first_step and self.embedding_model is not None:
+                vector = self._unit(await self.embedding_model.aembed_query(self._query(state["messages"])))
+            decision = self.recall(vector)
+            if decision is not None:
+                return decision
+            self.llm_calls += 1
+            decision = await supervisor.ainvoke(state, config=config)
+            if first_step:
+                self.learn(self._query(state["messages"]), decision.get("next"), vector)
+            return decision
+
+        return RunnableLambda(route, afunc=aroute, name="supervisor")
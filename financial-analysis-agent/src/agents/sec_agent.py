@@ -1,6 +1,8 @@
 from ..utils.helpers import create_agent
 from langchain_openai import ChatOpenAI
-from langchain_core.tools import Tool
+from langchain_core.tools import StructuredTool
+from typing import Optional
+from ..tools.analysis import analyze_financials
 
 def create_sec_agent(llm: ChatOpenAI, rag_chain):
     """Create an agent specialized in SEC filings analysis."""
@@ -11,6 +13,7 @@ def create_sec_agent(llm: ChatOpenAI, rag_chain):
     2. If numbers need industry comparison, explicitly request competitor data
     3. Always include specific numbers and trends from the filings
     4. If you spot significant changes or unusual patterns, highlight them
+    5. For revenue, margins, growth rates and ratios, use analyze_financials for exact figures
     
     Format your response as:
     1. Data from SEC Filings: [your findings]
@@ -18,16 +21,52 @@ def create_sec_agent(llm: ChatOpenAI, rag_chain):
     3. Analysis: [your insights]
     """
 
-    retrieve_tool = Tool(
+    def rag_input(query, ticker=None, fiscal_year=None, form_type=None, section=None):
+        filters = {
+            key: value
+            for key, value in {
+                "ticker": ticker,
+                "fiscal_year": fiscal_year,
+                "form_type": form_type,
+                "section": section,
+            }.items()
+            if value is not None
+        }
+        return {"question": query, "filters": filters} if filters else query
+
+    def retrieve_information(
+        query: str,
+        ticker: Optional[str] = None,
+        fiscal_year: Optional[int] = None,
+        form_type: Optional[str] = None,
+        section: Optional[str] = None,
+    ) -> str:
+        return rag_chain.invoke(rag_input(query, ticker, fiscal_year, form_type, section))
+
+    async def aretrieve_information(
+        query: str,
+        ticker: Optional[str] = None,
+        fiscal_year: Optional[int] = None,
+        form_type: Optional[str] = None,
+        section: Optional[str] = None,
+    ) -> str:
+        return await rag_chain.ainvoke(rag_input(query, ticker, fiscal_year, form_type, section))
+
+    retrieve_tool = StructuredTool.from_function(
+        func=retrieve_information,
+        coroutine=aretrieve_information,
         name="retrieve_information",
-        func=lambda x: rag_chain.invoke(x),
         description="""Use this tool to analyze SEC filings and extract specific 
         information from financial documents. Input should be a clear question 
-        about financial metrics, risks, or statements."""
+        about financial metrics, risks, or statements. When the question is about
+        a specific company or year, set ticker (e.g. "AAPL"), fiscal_year
+        (e.g. 2024) and/or form_type (e.g. "10-K") to search only those filings.
+        Set section to a 10-K Item (e.g. "Item 1A" for risk factors, "Item 7" for
+        MD&A, "Item 8" for financial statements) to search only that section."""
     )
 
     return create_agent(
         llm=llm,
-        tools=[retrieve_tool],
+        tools=[retrieve_tool, analyze_financials],
         system_prompt=system_prompt
     )
\ No newline at end of file
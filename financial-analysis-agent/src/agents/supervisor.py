@@ -1,8 +1,22 @@
 from langchain_openai import ChatOpenAI
+from typing import Optional
 from ..utils.helpers import create_team_supervisor
+from ..utils.history import with_compacted_history
+from .router import FastRouter
 
-def create_supervisor_agent(llm: ChatOpenAI):
-    """Creates the supervisor agent for financial research."""
+def create_supervisor_agent(
+    llm: ChatOpenAI,
+    allow_parallel: bool = False,
+    fast_router: Optional[FastRouter] = None,
+    history_token_budget: Optional[int] = None,
+):
+    """Creates the supervisor agent for financial research.
+
+    With a ``fast_router`` obvious routing decisions (and FINISH after a
+    complete single-source answer) are made locally; the LLM supervisor is
+    only called when the router is not confident. ``history_token_budget``
+    caps the history the LLM supervisor is sent (see ``compact_history``).
+    """
     
     supervisor_prompt = """You are a supervisor tasked with managing a conversation between
     Search and SECAnalyst workers. 
@@ -26,8 +40,13 @@ def create_supervisor_agent(llm: ChatOpenAI):
     
     Coordinate between agents until you have a complete analysis."""
     
-    return create_team_supervisor(
+    supervisor = create_team_supervisor(
         llm=llm,
         system_prompt=supervisor_prompt,
-        members=["Search", "SECAnalyst"]
-    )
\ No newline at end of file
+        members=["Search", "SECAnalyst"],
+        allow_parallel=allow_parallel,
+    )
+    supervisor = with_compacted_history(supervisor, history_token_budget, ["Search", "SECAnalyst"])
+    if fast_router is not None:
+        supervisor = fast_router.wrap(supervisor)
+    return supervisor
\ No newline at end of file
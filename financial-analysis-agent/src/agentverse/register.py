@@ -1,23 +1,71 @@
 import os
 import logging
+import uuid
 from fetchai.crypto import Identity
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from fetchai.registration import register_with_agentverse
 from fetchai.communication import parse_message_from_agent, send_message_to_agent
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from main import init_financial_system
+from main import answer_cache, fast_router, init_financial_system
+from src.graph.batch import MAX_BATCH_CONCURRENCY, MAX_BATCH_SIZE, abatch_research
+from src.graph.state import ainvoke_research, invoke_research
+from src.graph.streaming import format_sse, stream_research
+from src.utils.jobs import JobQueue
+from src.utils.loop import BackgroundLoop
+from src.utils.metrics import MetricsCallbackHandler, registry
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Every async view runs here, so async clients (e.g. Tavily's) are reused across requests
+async_loop = BackgroundLoop("agent-async")
+
+class AgentFlask(Flask):
+    def async_to_sync(self, func):
+        """Run async views on the shared loop instead of a new loop per request"""
+        def run(*args, **kwargs):
+            return async_loop.run(func(*args, **kwargs))
+        return run
+
 # Flask app for webhook
-flask_app = Flask(__name__)
+flask_app = AgentFlask(__name__)
 
 # Global variables
 financial_identity = None
 research_chain = None
+# Webhook analyses run here, off the request threads
+webhook_jobs = JobQueue(
+    "webhook",
+    workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+    max_depth=int(os.getenv("WEBHOOK_QUEUE_SIZE", "100")),
+)
+
+registry.gauge("financial_agent_answer_cache_hit_rate", "Answer cache hit rate since start", lambda: answer_cache.hit_rate)
+registry.gauge("financial_agent_answer_cache_entries", "Answers currently cached", lambda: answer_cache.stats()["entries"])
+registry.gauge("financial_agent_fast_routes", "Routing decisions made without the LLM supervisor", lambda: fast_router.fast_routes + fast_router.fast_finishes)
+registry.gauge("financial_agent_supervisor_llm_calls", "Routing decisions made by the LLM supervisor", lambda: fast_router.llm_calls)
+registry.gauge("financial_agent_webhook_queue_depth", "Webhook jobs waiting for a worker", lambda: webhook_jobs.depth)
+registry.gauge("financial_agent_webhook_busy_workers", "Webhook workers running a job", lambda: webhook_jobs.busy)
+registry.gauge("financial_agent_webhook_rejected", "Webhook requests rejected with 503 since start", lambda: webhook_jobs.rejected)
+
+def format_analysis(result):
+    """Messages of a graph result as JSON-ready dicts"""
+    return {
+        "analysis": [
+            {
+                "role": msg.type if hasattr(msg, 'type') else "message",
+                "content": msg.content,
+                "name": msg.name if hasattr(msg, 'name') else None
+            }
+            for msg in result.get('messages', [])
+        ]
+    }
+
+@flask_app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
 @flask_app.route('/api/analyze', methods=['POST'])
 async def analyze_financial_data():
@@ -29,30 +77,123 @@ async def analyze_financial_data():
         if not query:
             return jsonify({"error": "No query provided"}), 400
 
-        # Process query using research chain
-        result = research_chain.invoke({
-            "messages": [HumanMessage(content=query)],
-            "team_members": ["Search", "SECAnalyst"]
-        })
+        # Process query using research chain, without blocking on LLM/tool I/O
+        metrics_handler = MetricsCallbackHandler()
+        try:
+            # Retrying with the same request_id resumes from the last completed step
+            result = await ainvoke_research(
+                research_chain, query, data.get("request_id"), config={"callbacks": [metrics_handler]}
+            )
+        except Exception:
+            metrics_handler.finish("error")
+            raise
+        metrics_handler.finish()
 
-        # Format response
-        formatted_result = {
-            "analysis": [
-                {
-                    "role": msg.type if hasattr(msg, 'type') else "message",
-                    "content": msg.content,
-                    "name": msg.name if hasattr(msg, 'name') else None
-                }
-                for msg in result.get('messages', [])
-            ]
-        }
-
-        return jsonify(formatted_result)
+        return jsonify(format_analysis(result))
 
     except Exception as e:
         logger.error(f"Error processing request: {e}")
         return jsonify({"error": str(e)}), 500
 
+@flask_app.route('/api/analyze/batch', methods=['POST'])
+async def analyze_financial_data_batch():
+    """Answer a list of queries in one request; results come back in query order"""
+    try:
+        data = request.json or {}
+        queries = data.get("queries")
+
+        if not queries or not isinstance(queries, list) or not all(isinstance(q, str) and q for q in queries):
+            return jsonify({"error": "Provide a non-empty list of queries"}), 400
+        if len(queries) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"At most {MAX_BATCH_SIZE} queries per batch"}), 400
+        max_concurrency = data.get("max_concurrency", 8)
+        if isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int) or max_concurrency < 1:
+            return jsonify({"error": "max_concurrency must be a positive integer"}), 400
+
+        metrics_handler = MetricsCallbackHandler()
+        results = await abatch_research(
+            research_chain,
+            queries,
+            max_concurrency=min(max_concurrency, MAX_BATCH_CONCURRENCY),
+            # The RAG chain's (cached) embeddings, set when the chain was built
+            embedding_model=answer_cache.embedding_model,
+            batch_id=data.get("request_id"),
+            config={"callbacks": [metrics_handler]},
+        )
+        # Recorded under its own status so batches do not skew single-request latency
+        metrics_handler.finish("batch")
+
+        return jsonify({
+            "results": [
+                {"query": query, "error": result} if isinstance(result, str)
+                else {"query": query, **format_analysis(result)}
+                for query, result in zip(queries, results)
+            ]
+        })
+
+    except Exception as e:
+        logger.error(f"Error processing batch: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@flask_app.route('/api/analyze/stream', methods=['POST'])
+def analyze_financial_data_stream():
+    """Streaming variant of /api/analyze: Server-Sent Events as the run progresses.
+
+    Emits ``route`` (supervisor decisions), ``worker`` (each worker's
+    output), ``token`` (answer text as it is written) and finally ``done``
+    with the answer, or ``error``.
+    """
+    data = request.json or {}
+    query = data.get("query")
+
+    if not query:
+        return jsonify({"error": "No query provided"}), 400
+
+    def generate():
+        metrics_handler = MetricsCallbackHandler()
+        status = "ok"
+        try:
+            for event, payload in stream_research(
+                research_chain, query, data.get("request_id"), config={"callbacks": [metrics_handler]}
+            ):
+                if event == "error":
+                    status = "error"
+                yield format_sse(event, payload)
+        finally:
+            metrics_handler.finish(status)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        # Keep proxies (e.g. nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def process_webhook_request(query, agent_address, request_id):
+    """Worker job: run the research graph and send the analysis back to the requesting agent"""
+    metrics_handler = MetricsCallbackHandler()
+    try:
+        result = invoke_research(research_chain, query, request_id, config={"callbacks": [metrics_handler]})
+        metrics_handler.finish()
+        # Format the result - extract content from messages
+        payload = {'analysis_result': format_analysis(result), 'request_id': request_id}
+    except Exception as e:
+        metrics_handler.finish("error")
+        logger.error(f"Error processing webhook request {request_id}: {e}")
+        # The requester already got 202, so report the failure in the reply
+        payload = {
+            'analysis_result': {"analysis": [{"role": "error", "content": f"Error processing query: {e}", "name": None}]},
+            'request_id': request_id,
+            'error': str(e),
+        }
+
+    # Send response back
+    send_message_to_agent(
+        financial_identity,
+        agent_address,
+        payload
+    )
+
 # Flask route to handle webhook
 @flask_app.route('/webhook', methods=['POST'])
 def webhook():
@@ -66,32 +207,19 @@ def webhook():
         if not query:
             return jsonify({"status": "error", "message": "No query provided"}), 400
 
-        # Process the query using our research chain
-        result = research_chain.invoke({
-            "messages": [HumanMessage(content=query)],
-            "team_members": ["Search", "SECAnalyst"]
-        })
-
-        # Format the result - extract content from messages
-        formatted_result = {
-            "analysis": [
-                {
-                    "role": msg.type if hasattr(msg, 'type') else "message",
-                    "content": msg.content,
-                    "name": msg.name if hasattr(msg, 'name') else None
-                }
-                for msg in result.get('messages', [])
-            ]
-        }
-
-        # Send response back
-        payload = {'analysis_result': formatted_result}
-        send_message_to_agent(
-            financial_identity,
-            agent_address,
-            payload
-        )
-        return jsonify({"status": "analysis_sent"})
+        # Analyses take minutes; run them on the worker pool and answer right away.
+        # Senders that give no ID get one here, so the 202, the checkpoint thread and
+        # the result message all carry the same ID
+        request_id = message.payload.get("request_id") or uuid.uuid4().hex
+        if not webhook_jobs.submit(process_webhook_request, query, agent_address, request_id):
+            logger.warning(f"Webhook queue full ({webhook_jobs.depth} jobs); rejecting request {request_id}")
+            response = jsonify({
+                "status": "error",
+                "message": "Server overloaded, retry later",
+                "queue_depth": webhook_jobs.depth,
+            })
+            return response, 503, {"Retry-After": "30"}
+        return jsonify({"status": "accepted", "request_id": request_id, "queue_depth": webhook_jobs.depth}), 202
 
     except Exception as e:
         logger.error(f"Error in webhook: {e}")
@@ -135,7 +263,17 @@ def init_agent():
         logger.error(f"Error initializing agent: {e}")
         raise
 
+def init_worker():
+    """Per-process setup; with gunicorn this runs in each worker after the fork"""
+    webhook_jobs.start()
+
 def run_agent():
-    """Main function to run the agent"""
+    """Main function to run the agent with Flask's single-process server.
+
+    For several worker processes sharing one preloaded index, serve with
+    gunicorn instead: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+    """
     init_agent()
-    flask_app.run(host="0.0.0.0", port=5004, debug=True)
\ No newline at end of file
+    init_worker()
+    # No reloader: it would start a second process that builds the index again
+    flask_app.run(host="0.0.0.0", port=5004, debug=os.getenv("FLASK_DEBUG") == "1", use_reloader=False)
\ No newline at end of file
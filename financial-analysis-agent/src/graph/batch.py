@@ -0,0 +1,105 @@
+import asyncio
+import contextvars
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Union
+
+from langchain_core.embeddings import Embeddings
+
+from ..rag.answer_cache import normalize_question
+from .state import ainvoke_research, invoke_research
+
+# Largest questionnaire accepted in one call
+MAX_BATCH_SIZE = 50
+# Most graph runs one batch may have in flight
+MAX_BATCH_CONCURRENCY = 16
+
+
+def _unique_queries(queries: List[str]) -> Dict[str, str]:
+    """First spelling of each distinct question, keyed by its normalized form."""
+    unique = {}
+    for query in queries:
+        unique.setdefault(normalize_question(query), query)
+    return unique
+
+
+def _coalescing(embedding_model: Optional[Embeddings]):
+    # With CachedEmbeddings, the RAG sub-queries the concurrent runs issue
+    # (the SEC agent's tool inputs) are embedded in one request per wave
+    coalesce = getattr(embedding_model, "coalesce", None)
+    return coalesce() if coalesce is not None else nullcontext()
+
+
+def _check_size(queries: List[str]):
+    if len(queries) > MAX_BATCH_SIZE:
+        raise ValueError(f"A batch holds at most {MAX_BATCH_SIZE} queries, got {len(queries)}")
+
+
+def batch_research(
+    chain,
+    queries: List[str],
+    max_concurrency: int = 8,
+    embedding_model: Optional[Embeddings] = None,
+    batch_id: Optional[str] = None,
+    config: Optional[Dict] = None,
+) -> List[Union[dict, str]]:
+    """Answer a list of questions, returning one result per question in order.
+
+    Repeated questions (after normalization) run once and share their
+    result. At most ``max_concurrency`` graph runs are in flight. Given the
+    RAG chain's ``embedding_model`` (a ``CachedEmbeddings``), the retrieval
+    sub-queries those runs issue at about the same time are embedded
+    together in one request (see ``CachedEmbeddings.coalesce``); the
+    answer cache and retriever then find the vectors in memory. Searching
+    the index is in-process and stays per sub-query. Identical sub-queries
+    from concurrent runs are answered once by the answer cache. A failed
+    question yields an error string like ``process_financial_query`` and
+    does not affect the rest.
+    """
+    _check_size(queries)
+    unique = _unique_queries(queries)
+    batch_id = batch_id or uuid.uuid4().hex
+
+    def run(item):
+        i, query = item
+        try:
+            return invoke_research(chain, query, f"{batch_id}-{i}", config=config)
+        except Exception as e:
+            return f"Error processing query: {str(e)}"
+
+    workers = max(1, min(max_concurrency, len(unique)))
+    with _coalescing(embedding_model), ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each run gets a copy of this context, so it is inside the coalescing block
+        futures = [
+            executor.submit(contextvars.copy_context().run, run, item) for item in enumerate(unique.values())
+        ]
+        results = dict(zip(unique, [future.result() for future in futures]))
+    return [results[normalize_question(query)] for query in queries]
+
+
+async def abatch_research(
+    chain,
+    queries: List[str],
+    max_concurrency: int = 8,
+    embedding_model: Optional[Embeddings] = None,
+    batch_id: Optional[str] = None,
+    config: Optional[Dict] = None,
+) -> List[Union[dict, str]]:
+    """Async version of batch_research; runs share the caller's event loop."""
+    _check_size(queries)
+    unique = _unique_queries(queries)
+    batch_id = batch_id or uuid.uuid4().hex
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(i, query):
+        async with semaphore:
+            try:
+                return await ainvoke_research(chain, query, f"{batch_id}-{i}", config=config)
+            except Exception as e:
+                return f"Error processing query: {str(e)}"
+
+    with _coalescing(embedding_model):
+        answers = await asyncio.gather(*[run(i, query) for i, query in enumerate(unique.values())])
+    results = dict(zip(unique, answers))
+    return [results[normalize_question(query)] for query in queries]
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger(__name__)
+
+_reopen_lock = threading.Lock()
+
+
+class LocalCheckpointer(SqliteSaver):
+    """SQLite checkpointer usable from both ``invoke`` and ``ainvoke``.
+
+    ``SqliteSaver`` only implements the sync interface; the async methods
+    run the same statements in a worker thread (the saver serializes access
+    to the connection with its own lock), so one checkpoint file serves the
+    webhook and the async API alike.
+
+    Given its database ``path``, a process forked after the checkpointer
+    was created (e.g. a gunicorn worker) reopens the file instead of using
+    the parent's connection.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, path: Optional[str] = None, **kwargs):
+        super().__init__(conn, **kwargs)
+        self.path = path
+        self._pid = os.getpid()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if self.path and self.path != ":memory:" and self._pid != os.getpid():
+            with _reopen_lock:
+                if self._pid != os.getpid():
+                    self.conn = sqlite3.connect(self.path, check_same_thread=False)
+                    self.lock = threading.Lock()
+                    self._pid = os.getpid()
+        with super().cursor(transaction) as cur:
+            yield cur
+
+    async def aget_tuple(self, config: RunnableConfig):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint, metadata, new_versions=None) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id)
+
+    def delete_thread(self, thread_id: str):
+        """Drop every checkpoint and pending write of one run."""
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            cur.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    def prune(self, max_threads: int) -> int:
+        """Keep only the ``max_threads`` most recently written runs; returns how many were dropped."""
+        with self.cursor() as cur:
+            cur.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id ORDER BY MAX(rowid) DESC LIMIT -1 OFFSET ?",
+                (max_threads,),
+            )
+            stale = [(row[0],) for row in cur.fetchall()]
+            if stale:
+                cur.executemany("DELETE FROM checkpoints WHERE thread_id = ?", stale)
+                cur.executemany("DELETE FROM writes WHERE thread_id = ?", stale)
+        return len(stale)
+
+
+def create_checkpointer(path: str, max_threads: Optional[int] = 10_000) -> LocalCheckpointer:
+    """Open (or create) the checkpoint database at ``path``.
+
+    Old runs beyond the ``max_threads`` most recent are pruned on open so
+    the file does not grow without bound.
+    """
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Shared by Flask's request threads; SqliteSaver locks around every statement
+    conn = sqlite3.connect(path, check_same_thread=False)
+    checkpointer = LocalCheckpointer(conn, path)
+    if max_threads is not None:
+        dropped = checkpointer.prune(max_threads)
+        if dropped:
+            logger.info(f"Pruned {dropped} old runs from {path}")
+    return checkpointer
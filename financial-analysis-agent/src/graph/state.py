@@ -1,12 +1,15 @@
-from typing import Annotated, List, TypedDict, Dict
+from typing import Annotated, List, Optional, TypedDict, Dict
 from langchain_core.messages import BaseMessage, HumanMessage
+import logging
 import operator
+import uuid
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
-import functools
 
-from ..agents import create_search_agent, create_sec_agent, create_supervisor_agent
-from ..utils.helpers import agent_node
+from ..agents import FastRouter, create_search_agent, create_sec_agent, create_supervisor_agent
+from ..utils.helpers import create_agent_node
+
+logger = logging.getLogger(__name__)
 
 class ResearchTeamState(TypedDict):
     """Define the state structure for the research team."""
@@ -16,22 +19,71 @@ class ResearchTeamState(TypedDict):
     information_needed: List[str] = []
     reasoning: str = ""
 
-def create_research_graph(rag_chain) -> StateGraph:
-    """Create the research team graph with all agents and supervisor."""
+WORKERS = ["Search", "SECAnalyst"]
+
+def join_node(state):
+    """Barrier after the workers: runs once every worker sent this round has reported."""
+    # Worker messages are already merged into state by the messages reducer;
+    # this round's requests have been served
+    return {"information_needed": []}
+
+def route(state):
+    """Map the supervisor's decision to the next node(s); "ALL" fans out to every worker."""
+    if state["next"] == "ALL":
+        return WORKERS
+    return state["next"]
+
+def create_research_graph(
+    rag_chain,
+    parallel: bool = False,
+    fast_router: Optional[FastRouter] = None,
+    history_token_budget: Optional[int] = 6000,
+    checkpointer=None,
+    llm=None,
+) -> StateGraph:
+    """Create the research team graph with all agents and supervisor.
+
+    With ``parallel`` the supervisor may route to "ALL": Search and
+    SECAnalyst then run concurrently and a join step collects both of their
+    findings before the supervisor decides again, so two-source questions
+    take about as long as the slower worker instead of both back to back.
+
+    A ``fast_router`` routes obvious questions and finishes complete
+    single-source answers without calling the LLM supervisor.
+
+    ``history_token_budget`` bounds the conversation history sent with each
+    supervisor and agent call: the question and each worker's latest output
+    are kept, older turns are shortened or dropped. The graph state (and
+    the returned result) still holds every message. ``None`` disables it.
+
+    With a ``checkpointer`` (see ``graph.checkpoint``) the state is saved
+    after every step under the run's thread ID; ``invoke_research`` uses it
+    to resume a failed run from its last completed step.
+
+    ``llm`` replaces the default chat model used by the agents and the
+    supervisor.
+    """
     
+    if fast_router is not None and fast_router.allow_parallel and not parallel:
+        raise ValueError("fast_router routes to ALL but the graph is not parallel")
+
     # Initialize LLM
-    llm = ChatOpenAI(model="gpt-4-turbo-preview")
+    if llm is None:
+        # Streaming so answer tokens reach callbacks (see graph.streaming) as they are written
+        llm = ChatOpenAI(model="gpt-4-turbo-preview", streaming=True)
     
     # Create agents
     search_agent = create_search_agent(llm)
     sec_agent = create_sec_agent(llm, rag_chain)
     
     # Create agent nodes
-    search_node = functools.partial(agent_node, agent=search_agent, name="Search")
-    sec_node = functools.partial(agent_node, agent=sec_agent, name="SECAnalyst")
+    search_node = create_agent_node(search_agent, "Search", history_token_budget, WORKERS)
+    sec_node = create_agent_node(sec_agent, "SECAnalyst", history_token_budget, WORKERS)
     
     # Create supervisor
-    supervisor = create_supervisor_agent(llm)
+    supervisor = create_supervisor_agent(
+        llm, allow_parallel=parallel, fast_router=fast_router, history_token_budget=history_token_budget
+    )
     
     # Create graph
     graph = StateGraph(ResearchTeamState)
@@ -42,13 +94,21 @@ def create_research_graph(rag_chain) -> StateGraph:
     graph.add_node("supervisor", supervisor)
     
     # Add edges
-    graph.add_edge("Search", "supervisor")
-    graph.add_edge("SECAnalyst", "supervisor")
+    if parallel:
+        # Workers sent out together finish in the same step, so join runs
+        # once with all of their messages
+        graph.add_node("join", join_node)
+        graph.add_edge("Search", "join")
+        graph.add_edge("SECAnalyst", "join")
+        graph.add_edge("join", "supervisor")
+    else:
+        graph.add_edge("Search", "supervisor")
+        graph.add_edge("SECAnalyst", "supervisor")
     
     # Add conditional edges from supervisor
     graph.add_conditional_edges(
         "supervisor",
-        lambda x: x["next"],
+        route,
         {
             "Search": "Search",
             "SECAnalyst": "SECAnalyst",
@@ -59,17 +119,83 @@ def create_research_graph(rag_chain) -> StateGraph:
     # Set entry point
     graph.set_entry_point("supervisor")
     
-    return graph.compile()
+    return graph.compile(checkpointer=checkpointer)
+
+def initial_state(query: str) -> Dict:
+    return {
+        "messages": [HumanMessage(content=query)],
+        "team_members": WORKERS,
+        "information_needed": [],
+        "reasoning": ""
+    }
+
+def thread_config(request_id: Optional[str] = None, config: Optional[Dict] = None) -> Dict:
+    """Run config whose checkpoint thread is the request ID (a fresh one if not given)."""
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "thread_id": request_id or uuid.uuid4().hex}
+    return config
+
+def _research_input(snapshot, query: str):
+    """Input that starts a new run, or None to resume the checkpointed one."""
+    # A run that failed before its first step has no messages yet
+    if not snapshot.values.get("messages"):
+        return initial_state(query)
+    if snapshot.values["messages"][0].content != query:
+        raise ValueError(f"Request {snapshot.config['configurable']['thread_id']} was already used for another query")
+    return None
+
+def invoke_research(chain, query: str, request_id: Optional[str] = None, config: Optional[Dict] = None, retries: int = 1):
+    """Run the graph for ``query``, resuming from checkpoints when the graph has them.
 
-def process_financial_query(chain, query: str):
+    Runs are checkpointed under ``request_id``: a retry with the same ID
+    continues after the last completed step (pending writes of workers that
+    finished in the failed step are reused), and a finished run returns its
+    stored result without calling any model. Failed runs are retried in
+    place up to ``retries`` times. Without a checkpointer this is a plain
+    ``invoke``.
+    """
+    if chain.checkpointer is None:
+        return chain.invoke(initial_state(query), config=config)
+    config = thread_config(request_id, config)
+    for attempt in range(retries + 1):
+        snapshot = chain.get_state(config)
+        research_input = _research_input(snapshot, query)
+        if research_input is None and not snapshot.next:
+            return snapshot.values
+        try:
+            return chain.invoke(research_input, config=config)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"Run {config['configurable']['thread_id']} failed ({e}); resuming from checkpoint")
+
+async def ainvoke_research(chain, query: str, request_id: Optional[str] = None, config: Optional[Dict] = None, retries: int = 1):
+    """Async version of invoke_research."""
+    if chain.checkpointer is None:
+        return await chain.ainvoke(initial_state(query), config=config)
+    config = thread_config(request_id, config)
+    for attempt in range(retries + 1):
+        snapshot = await chain.aget_state(config)
+        research_input = _research_input(snapshot, query)
+        if research_input is None and not snapshot.next:
+            return snapshot.values
+        try:
+            return await chain.ainvoke(research_input, config=config)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"Run {config['configurable']['thread_id']} failed ({e}); resuming from checkpoint")
+
+def process_financial_query(chain, query: str, request_id: Optional[str] = None):
     """Process a financial query through the research graph."""
     try:
-        result = chain.invoke({
-            "messages": [HumanMessage(content=query)],
-            "team_members": ["Search", "SECAnalyst"],
-            "information_needed": [],
-            "reasoning": ""
-        })
-        return result
+        return invoke_research(chain, query, request_id)
+    except Exception as e:
+        return f"Error processing query: {str(e)}"
+
+async def aprocess_financial_query(chain, query: str, request_id: Optional[str] = None):
+    """Async version of process_financial_query; many can run concurrently on one event loop."""
+    try:
+        return await ainvoke_research(chain, query, request_id)
     except Exception as e:
-        return f"Error processing query: {str(e)}"
\ No newline at end of file
+        return f"Error processing query: {str(e)}"
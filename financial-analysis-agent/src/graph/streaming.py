@@ -0,0 +1,120 @@
+import json
+import logging
+import queue
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .state import WORKERS, _research_input, initial_state, thread_config
+
+logger = logging.getLogger(__name__)
+
+# Seconds without events after which an SSE comment is sent to keep proxies from closing the stream
+KEEPALIVE_SECONDS = 15
+
+
+class TokenQueueHandler(BaseCallbackHandler):
+    """Puts the text tokens of streaming LLM calls on a queue, tagged with their graph node."""
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+        self._nodes: Dict[UUID, str] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._nodes[run_id] = (metadata or {}).get("langgraph_node", "")
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        # Routing and tool-call chunks carry no text
+        if token:
+            self.events.put(("token", {"node": self._nodes.get(run_id, ""), "text": token}))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._nodes.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._nodes.pop(run_id, None)
+
+
+def _update_events(update: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Client events for one step's node outputs (``stream_mode="updates"``)."""
+    for node, output in update.items():
+        if node == "supervisor":
+            yield "route", {"next": output.get("next"), "reasoning": output.get("reasoning", "")}
+        elif node in WORKERS:
+            for message in output.get("messages", []):
+                yield "worker", {"name": node, "content": message.content}
+
+
+def stream_research(
+    chain,
+    query: str,
+    request_id: Optional[str] = None,
+    config: Optional[Dict] = None,
+) -> Iterator[Tuple[str, Dict]]:
+    """Run the graph for ``query`` and yield ``(event, data)`` pairs as it goes.
+
+    Events are ``route`` (each supervisor decision), ``worker`` (each
+    worker's finished output), ``token`` (answer text as the model writes
+    it; needs a model created with ``streaming=True``), then ``done`` with
+    the final answer or ``error``. The graph runs in a background thread;
+    if the consumer stops reading, the run still completes, and with a
+    checkpointer a new request with the same ``request_id`` returns it.
+    """
+    events = queue.Queue()
+    config = dict(config or {})
+    config["callbacks"] = list(config.get("callbacks") or []) + [TokenQueueHandler(events)]
+    if chain.checkpointer is not None:
+        config = thread_config(request_id, config)
+
+    def run():
+        try:
+            research_input = initial_state(query)
+            if chain.checkpointer is not None:
+                snapshot = chain.get_state(config)
+                research_input = _research_input(snapshot, query)
+                if research_input is None and not snapshot.next:
+                    events.put(("done", snapshot.values))
+                    return
+            values = None
+            for update in chain.stream(research_input, config=config, stream_mode=["updates", "values"]):
+                mode, payload = update
+                if mode == "updates":
+                    for event in _update_events(payload):
+                        events.put(event)
+                else:
+                    values = payload
+            events.put(("done", values))
+        except Exception as e:
+            logger.error(f"Streaming run failed: {e}")
+            events.put(("error", {"message": str(e)}))
+
+    threading.Thread(target=run, name="stream-research", daemon=True).start()
+    while True:
+        try:
+            event, data = events.get(timeout=KEEPALIVE_SECONDS)
+        except queue.Empty:
+            yield "keepalive", {}
+            continue
+        if event == "done":
+            yield "done", {"answer": _final_answer(data), "request_id": config.get("configurable", {}).get("thread_id")}
+            return
+        yield event, data
+        if event == "error":
+            return
+
+
+def _final_answer(values: Optional[Dict]) -> str:
+    """The latest worker output, which the supervisor finished on."""
+    for message in reversed((values or {}).get("messages", [])):
+        if getattr(message, "name", None) in WORKERS:
+            return message.content
+    return ""
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """One Server-Sent Events frame; keepalives are comments clients ignore."""
+    if event == "keepalive":
+        return ": keepalive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableLambda
+
+# Figures and years in a question; questions that differ in them never share an answer
+_NUMBERS = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace: "What's  revenue?" -> "what s revenue"."""
+    question = re.sub(r"[^\w\s&%$.]+|(?<!\d)\.|\.(?!\d)", " ", question.lower())
+    return re.sub(r"\s+", " ", question).strip()
+
+
+class SemanticAnswerCache:
+    """Answer cache for the RAG chain, matched exactly or by embedding similarity.
+
+    A question first looks up its normalized text; failing that, the cached
+    question with the highest cosine similarity is reused if it clears
+    ``threshold``. Similarity is only compared between questions with the
+    same filters and the same figures and years, so "revenue in 2023" never
+    answers "revenue in 2024". Entries expire after ``ttl_seconds`` and the
+    least recently used are evicted beyond ``max_entries``. The cache is
+    bound to an index fingerprint and empties itself when that changes.
+
+    Identical questions asked while the first is still being answered wait
+    for that answer instead of running the chain again.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Optional[Embeddings] = None,
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000,
+    ):
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.fingerprint = None
+        # key -> (partition, answer, created_at); insertion order is LRU order
+        self._entries = OrderedDict()
+        # partition -> (keys, unit-norm question vectors as rows)
+        self._vectors = {}
+        # key -> Future of the answer being computed for it
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared = 0
+
+    def bind_index(self, fingerprint: str):
+        """Tie cached answers to an index build; a different build clears the cache."""
+        with self._lock:
+            if self.fingerprint != fingerprint:
+                self._clear()
+                self.fingerprint = fingerprint
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._vectors.clear()
+
+    @staticmethod
+    def _keys(question: str, filters: Optional[dict]) -> Tuple[str, str]:
+        partition = json.dumps(
+            {
+                "filters": filters or {},
+                "numbers": sorted(n.replace(",", "") for n in _NUMBERS.findall(question)),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return f"{partition}|{normalize_question(question)}", partition
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        if self.embedding_model is None:
+            return None
+        return self._unit(self.embedding_model.embed_query(question))
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, created_at: float) -> bool:
+        return time.monotonic() - created_at > self.ttl_seconds
+
+    def _remove(self, key: str):
+        partition, _, _ = self._entries.pop(key)
+        keys, matrix = self._vectors.get(partition, ([], None))
+        if key in keys:
+            row = keys.index(key)
+            keys.pop(row)
+            matrix = np.delete(matrix, row, axis=0)
+            if keys:
+                self._vectors[partition] = (keys, matrix)
+            else:
+                del self._vectors[partition]
+
+    def _exact(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[2]):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(key)
+        return None
+
+    def lookup(self, question: str, filters: Optional[dict] = None) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """Return ``(answer, question_vector)``; the vector is reused by ``store`` on a miss."""
+        key, partition = self._keys(question, filters)
+        answer = self._exact(key)
+        if answer is not None:
+            return answer, None
+        # Embed outside the lock; on a miss the vector is kept for store()
+        return self._semantic(partition, self._embed(question))
+
+    async def alookup(self, question: str, filters: Optional[dict] = None) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """``lookup`` with the question embedded asynchronously."""
+        key, partition = self._keys(question, filters)
+        answer = self._exact(key)
+        if answer is not None:
+            return answer, None
+        vector = None
+        if self.embedding_model is not None:
+            vector = self._unit(await self.embedding_model.aembed_query(question))
+        return self._semantic(partition, vector)
+
+    def _semantic(self, partition: str, vector: Optional[np.ndarray]) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        with self._lock:
+            if vector is None or partition not in self._vectors:
+                self.misses += 1
+                return None, vector
+
+            keys, matrix = self._vectors.get(partition, ([], None))
+            while keys:
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] < self.threshold:
+                    break
+                match = keys[best]
+                if self._expired(self._entries[match][2]):
+                    self._remove(match)
+                    keys, matrix = self._vectors.get(partition, ([], None))
+                    continue
+                self._entries.move_to_end(match)
+                self.semantic_hits += 1
+                return self._entries[match][1], vector
+            self.misses += 1
+            return None, vector
+
+    def store(self, question: str, answer: str, filters: Optional[dict] = None, vector: Optional[np.ndarray] = None):
+        key, partition = self._keys(question, filters)
+        if vector is None:
+            vector = self._embed(question)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (partition, answer, time.monotonic())
+            if vector is not None:
+                keys, matrix = self._vectors.get(partition, ([], np.empty((0, len(vector)), dtype=np.float32)))
+                self._vectors[partition] = (keys + [key], np.vstack([matrix, vector[None, :]]))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "shared": self.shared,
+                "hit_rate": round(self.hit_rate, 4),
+            }
+
+    def _claim(self, question: str, filters: Optional[dict]) -> Tuple[str, Future, bool]:
+        """The in-flight answer for this question, and whether the caller must compute it."""
+        key = self._keys(question, filters)[0]
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                return key, future, False
+            future = self._inflight[key] = Future()
+            return key, future, True
+
+    def _settle(self, key: str, future: Future, answer: Optional[str] = None, error: Optional[BaseException] = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(answer)
+
+    def wrap(self, chain: Runnable, split_input) -> Runnable:
+        """Put the cache in front of ``chain``; ``split_input`` maps inputs to (question, filters)."""
+
+        def cached(inputs, config):
+            question, filters = split_input(inputs)
+            answer, vector = self.lookup(question, filters)
+            if answer is not None:
+                return answer
+            key, future, owner = self._claim(question, filters)
+            if not owner:
+                return future.result()
+            try:
+                answer = chain.invoke(inputs, config=config)
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+            self.store(question, answer, filters, vector)
+            self._settle(key, future, answer)
+            return answer
+
+        async def acached(inputs, config):
+            question, filters = split_input(inputs)
+            answer, vector = await self.alookup(question, filters)
+            if answer is not None:
+                return answer
+            key, future, owner = self._claim(question, filters)
+            if not owner:
+                return await asyncio.wrap_future(future)
+            try:
+                answer = await chain.ainvoke(inputs, config=config)
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+            self.store(question, answer, filters, vector)
+            self._settle(key, future, answer)
+            return answer
+
+        return RunnableLambda(cached, afunc=acached, name="cached_rag_chain")
@@ -1,27 +1,128 @@
+import os
 from langchain_openai.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Qdrant
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from .loader import DocumentLoader
+from langchain_core.runnables import RunnableLambda
+from typing import Optional, Tuple, Union
+from .index import load_or_build_vectorstore
+from .vector_index import load_or_build_vector_index
+from .keyword_index import HybridRetriever, load_or_build_keyword_index
+from .embeddings import CachedEmbeddings
+from .answer_cache import SemanticAnswerCache
+from .corpus import create_loader, with_filters
+from .sections import SectionIndex, infer_section
 
-def create_rag_chain(file_path: str = "data/raw/apple_10k.pdf"):
-    # Load and split document
-    loader = DocumentLoader(file_path)
-    split_chunks = loader.load_and_split()
+def _split_input(inputs: Union[str, dict]) -> Tuple[str, Optional[dict]]:
+    """Accept either a bare question or ``{"question": ..., "filters": {...}}``."""
+    if isinstance(inputs, dict):
+        return inputs["question"], inputs.get("filters")
+    return inputs, None
+
+def create_rag_chain(
+    file_path: str = "data/raw/apple_10k.pdf",
+    persist_dir: Optional[str] = None,
+    embedding_model: Optional[Embeddings] = None,
+    embedding_cache_path: Optional[str] = None,
+    retriever_mode: str = "hybrid",
+    top_k: Optional[int] = None,
+    answer_cache: Optional[SemanticAnswerCache] = None,
+    vector_backend: str = "qdrant",
+    llm: Optional[BaseChatModel] = None,
+    rescore: bool = True,
+):
+    """Build the RAG chain over a filing or a directory of filings.
+
+    When ``persist_dir`` is given the vector index is stored on disk and
+    reused across restarts as long as the filing and chunking are unchanged.
+    ``embedding_cache_path`` enables the per-chunk embedding cache, so a
+    rebuild only pays for chunks whose text changed.
+
+    Every chunk carries ticker, form type, fiscal year and page metadata.
+    The chain takes a question string, or a dict with a ``question`` and
+    optional ``filters`` (e.g. ``{"ticker": "AAPL", "fiscal_year": 2023}``)
+    restricting retrieval to that slice of the corpus. A ``section`` filter
+    (e.g. ``"Item 1A"``) limits search to that 10-K Item; without one, the
+    section is inferred from the question when it is unambiguous (pass
+    ``"section": None`` to search the whole filing).
+
+    ``retriever_mode="hybrid"`` (the default) fuses vector search with a
+    BM25 keyword index built next to the vector store, which finds exact
+    figures and line-item names dense search misses; ``"vector"`` uses the
+    vector store alone. ``top_k`` is the number of chunks put in the prompt
+    (3 for hybrid, 4 for vector by default).
+
+    With an ``answer_cache`` repeated and near-identical questions are
+    answered from the cache instead of running retrieval and the LLM. The
+    cache is bound to this index build, so rebuilding the index empties it.
+
+    ``vector_backend="quantized"`` serves vectors from an in-process int8
+    numpy index instead of Qdrant (``"quantized-float16"`` for float16),
+    which uses less memory per worker and searches small corpora faster.
+    With ``rescore`` (the default) its top candidates are re-ranked against
+    memory-mapped float32 vectors; ``rescore=False`` skips storing them.
+
+    ``llm`` replaces the default ``gpt-4-turbo-preview`` answer model
+    (e.g. with a local stand-in for benchmarks).
+    """
+    # Load and split document(s)
+    loader = create_loader(file_path)
+    collection_prefix = os.path.splitext(os.path.basename(os.path.normpath(file_path)))[0]
     
     # Create embeddings and vectorstore
-    embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
-    vectorstore = Qdrant.from_documents(
-        split_chunks,
-        embedding_model,
-        location=":memory:",
-        collection_name="apple_10k",
-    )
+    if embedding_model is None:
+        embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+    if embedding_cache_path:
+        embedding_model = CachedEmbeddings(embedding_model, embedding_cache_path)
+    if vector_backend == "qdrant":
+        vectorstore, index_entry = load_or_build_vectorstore(
+            loader,
+            embedding_model,
+            collection_prefix=collection_prefix,
+            persist_dir=persist_dir,
+        )
+    elif vector_backend in ("quantized", "quantized-int8", "quantized-float16"):
+        vectorstore, index_entry = load_or_build_vector_index(
+            loader,
+            embedding_model,
+            collection_prefix=collection_prefix,
+            persist_dir=persist_dir,
+            dtype="float16" if vector_backend.endswith("float16") else "int8",
+            rescore=rescore,
+        )
+    else:
+        raise ValueError(f"Unknown vector_backend: {vector_backend}")
     
     # Create retriever
-    retriever = vectorstore.as_retriever()
+    if retriever_mode == "hybrid":
+        keyword_index = load_or_build_keyword_index(vectorstore, collection_prefix, persist_dir)
+        retriever = HybridRetriever(
+            vectorstore=vectorstore,
+            keyword_index=keyword_index,
+            search_kwargs={"k": top_k or 3},
+        )
+    elif retriever_mode == "vector":
+        retriever = vectorstore.as_retriever(search_kwargs={"k": top_k or 4})
+    else:
+        raise ValueError(f"Unknown retriever_mode: {retriever_mode}")
+    section_index = SectionIndex(index_entry["sections"])
+
+    def retrieve(inputs, config):
+        question, filters = _split_input(inputs)
+        filters = dict(filters or {})
+        # Scope questions that clearly target one 10-K Item to that section
+        if "section" not in filters:
+            filters["section"] = infer_section(question)
+        return with_filters(retriever, filters, section_index).invoke(question, config=config)
+
+    async def aretrieve(inputs, config):
+        question, filters = _split_input(inputs)
+        filters = dict(filters or {})
+        if "section" not in filters:
+            filters["section"] = infer_section(question)
+        return await with_filters(retriever, filters, section_index).ainvoke(question, config=config)
     
     # Create prompt
     template = """You are a financial analyst. Use the provided context to answer questions about the company's financials.
@@ -35,10 +136,20 @@ def create_rag_chain(file_path: str = "data/raw/apple_10k.pdf"):
     
     # Create chain
     chain = (
-        {"context": retriever, "question": RunnablePassthrough()}
+        {
+            "context": RunnableLambda(retrieve, afunc=aretrieve),
+            "question": RunnableLambda(lambda inputs: _split_input(inputs)[0]),
+        }
         | prompt
-        | ChatOpenAI(model="gpt-4-turbo-preview")
+        | (llm or ChatOpenAI(model="gpt-4-turbo-preview"))
         | StrOutputParser()
     )
+
+    # Answer repeated questions from the cache
+    if answer_cache is not None:
+        if answer_cache.embedding_model is None:
+            answer_cache.embedding_model = embedding_model
+        answer_cache.bind_index(index_entry["fingerprint"])
+        chain = answer_cache.wrap(chain, _split_input)
     
-    return chain
\ No newline at end of file
+    return chain
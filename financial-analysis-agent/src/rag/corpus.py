@@ -0,0 +1,210 @@
+import glob
+import json
+import os
+import re
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pymupdf
+from langchain_core.documents import Document
+from qdrant_client.http import models as rest
+
+from .loader import DocumentLoader
+from .sections import SectionIndex, normalize_section
+
+FILINGS_MANIFEST = "filings.json"
+
+# Metadata fields recorded on every chunk that retrieval can filter on
+FILTER_FIELDS = ("ticker", "form_type", "fiscal_year", "page", "section")
+
+_FORM_PATTERN = re.compile(r"(?<![0-9])(10|20|8)[-_ ]?([kqf])(?![a-z])", re.IGNORECASE)
+_YEAR_PATTERN = re.compile(r"(?:fy)?((?:19|20)\d{2})(?!\d)", re.IGNORECASE)
+
+
+def filing_metadata(file_path: str, overrides: Optional[dict] = None) -> dict:
+    """Infer ticker, form type and fiscal year for a filing.
+
+    Names like ``AAPL_10-K_2023.pdf`` are parsed directly; a missing fiscal
+    year falls back to the PDF title (e.g. "10-K 2024, ..."). Anything in
+    ``overrides`` (usually from ``filings.json``) wins.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    metadata = {"ticker": re.split(r"[_\-\s]+", stem)[0].upper()}
+
+    form = _FORM_PATTERN.search(stem)
+    if form:
+        metadata["form_type"] = f"{form.group(1)}-{form.group(2).upper()}"
+
+    year = _YEAR_PATTERN.search(stem[form.end():] if form else stem)
+    if year is None:
+        with pymupdf.open(file_path) as doc:
+            title = doc.metadata.get("title") or ""
+        year = _YEAR_PATTERN.search(title)
+    if year:
+        metadata["fiscal_year"] = int(year.group(1))
+
+    metadata.update(overrides or {})
+    return metadata
+
+
+def build_qdrant_filter(
+    filters: Optional[dict], section_index: Optional[SectionIndex] = None
+) -> Optional[rest.Filter]:
+    """Translate ``{"ticker": "AAPL", "fiscal_year": [2023, 2024]}`` into a Qdrant filter.
+
+    Scalars must match exactly, lists match any of their values; all fields
+    must hold. ``None`` values are ignored. A ``section`` is resolved through
+    the section index into chunk-index ranges; sections the index has never
+    seen are ignored rather than matching nothing.
+    """
+    conditions = []
+    for field, value in (filters or {}).items():
+        if value is None:
+            continue
+        if field == "section":
+            if section_index is not None:
+                condition = _section_condition(value, section_index)
+                if condition is not None:
+                    conditions.append(condition)
+            continue
+        key = f"metadata.{field}"
+        if isinstance(value, (list, tuple, set)):
+            conditions.append(rest.FieldCondition(key=key, match=rest.MatchAny(any=list(value))))
+        else:
+            conditions.append(rest.FieldCondition(key=key, match=rest.MatchValue(value=value)))
+    return rest.Filter(must=conditions) if conditions else None
+
+
+def _section_condition(value, section_index: SectionIndex) -> Optional[rest.Filter]:
+    sections = value if isinstance(value, (list, tuple, set)) else [value]
+    spans = [
+        span
+        for section in sections
+        for span in section_index.get(normalize_section(section) or section)
+    ]
+    if not spans:
+        return None
+    return rest.Filter(should=[
+        rest.FieldCondition(key="metadata.chunk_index", range=rest.Range(gte=start, lt=stop))
+        for start, stop in spans
+    ])
+
+
+class MetadataColumns:
+    """Evaluate Qdrant filters against chunk metadata held outside Qdrant.
+
+    Covers the subset of the filter language ``build_qdrant_filter`` emits
+    (must/should/must_not, exact and any-of matches, ranges) and returns a
+    boolean mask over the chunks, so in-process indexes can apply the same
+    filters as the vector store.
+    """
+
+    def __init__(self, metadatas: List[dict]):
+        self.metadatas = metadatas
+        self._columns = {}
+
+    def column(self, key: str) -> np.ndarray:
+        """Metadata field as an array over all chunks (``None`` where missing)."""
+        column = self._columns.get(key)
+        if column is None:
+            field = key.split(".", 1)[-1]
+            column = np.empty(len(self.metadatas), dtype=object)
+            column[:] = [metadata.get(field) for metadata in self.metadatas]
+            self._columns[key] = column
+        return column
+
+    def numeric_column(self, key: str) -> np.ndarray:
+        """Metadata field as floats; missing values are NaN and fail every range bound."""
+        column = self._columns.get((key, float))
+        if column is None:
+            column = np.array([np.nan if v is None else v for v in self.column(key)], dtype=np.float64)
+            self._columns[(key, float)] = column
+        return column
+
+    def mask(self, condition) -> np.ndarray:
+        if isinstance(condition, rest.Filter):
+            mask = np.ones(len(self.metadatas), dtype=bool)
+            for sub in condition.must or []:
+                mask &= self.mask(sub)
+            if condition.should:
+                mask &= np.logical_or.reduce([self.mask(sub) for sub in condition.should])
+            for sub in condition.must_not or []:
+                mask &= ~self.mask(sub)
+            return mask
+
+        if isinstance(condition.match, rest.MatchValue):
+            return self.column(condition.key) == condition.match.value
+        if isinstance(condition.match, rest.MatchAny):
+            return np.isin(self.column(condition.key), list(condition.match.any))
+        if condition.range is not None:
+            values = self.numeric_column(condition.key)
+            mask = np.ones(len(self.metadatas), dtype=bool)
+            bounds = condition.range
+            for bound, compare in (
+                (bounds.gte, np.greater_equal), (bounds.gt, np.greater),
+                (bounds.lte, np.less_equal), (bounds.lt, np.less),
+            ):
+                if bound is not None:
+                    mask &= compare(values, bound)
+            return mask
+        raise ValueError(f"Unsupported filter condition: {condition!r}")
+
+
+def load_filing_overrides(directory: str) -> dict:
+    """Per-file metadata overrides from a directory's ``filings.json``, if any."""
+    manifest_path = os.path.join(directory, FILINGS_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def with_filters(retriever, filters: Optional[dict], section_index: Optional[SectionIndex] = None):
+    """Return a copy of ``retriever`` restricted to chunks matching ``filters``."""
+    search_filter = build_qdrant_filter(filters, section_index)
+    if search_filter is None:
+        return retriever
+    return retriever.copy(
+        update={"search_kwargs": {**retriever.search_kwargs, "filter": search_filter}}
+    )
+
+
+class FilingCorpusLoader:
+    """Load every filing in a directory, tagging chunks with filing metadata.
+
+    Exposes the same interface as ``DocumentLoader`` so the index builder can
+    treat a corpus like a single file.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 300, chunk_overlap: int = 0, pattern: str = "*.pdf"):
+        self.file_path = directory
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.pattern = pattern
+
+    def filings(self) -> List[DocumentLoader]:
+        overrides = load_filing_overrides(self.file_path)
+        return [
+            DocumentLoader(
+                path,
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                metadata=filing_metadata(path, overrides.get(os.path.basename(path))),
+            )
+            for path in sorted(glob.glob(os.path.join(self.file_path, self.pattern)))
+        ]
+
+    def iter_chunks(self, **kwargs) -> Iterator[Document]:
+        for loader in self.filings():
+            yield from loader.iter_chunks(**kwargs)
+
+    def load_and_split(self) -> List[Document]:
+        return [chunk for loader in self.filings() for chunk in loader.load_and_split()]
+
+
+def create_loader(path: str):
+    """Loader for a single filing or, for a directory, the whole corpus."""
+    if os.path.isdir(path):
+        return FilingCorpusLoader(path)
+    overrides = load_filing_overrides(os.path.dirname(path) or ".")
+    return DocumentLoader(path, metadata=filing_metadata(path, overrides.get(os.path.basename(path))))
@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, FrozenSet, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .index import embedding_model_name
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic local embedder for offline runs and throughput testing.
+
+    Tokens are hashed into a fixed number of signed buckets (the "hashing
+    trick") and the result is L2-normalised, so texts sharing vocabulary get
+    a positive cosine similarity. No network calls, no model weights.
+    """
+
+    def __init__(self, size: int = 1536):
+        self.size = size
+        self.model = f"local-hash-{size}"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for token in re.findall(r"\w+", text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.size] += 1.0 if (digest >> 63) & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+# CachedEmbeddings instances whose coalesce() block the current code runs in;
+# threads and tasks started inside the block inherit it with the context
+_coalescing: ContextVar[FrozenSet["CachedEmbeddings"]] = ContextVar("coalescing", default=frozenset())
+
+
+class CachedEmbeddings(Embeddings):
+    """Chunk-level embedding cache backed by SQLite.
+
+    Vectors are keyed by a hash of the model name and chunk text, so
+    re-ingesting a lightly edited filing only embeds the chunks that changed.
+    The store is trimmed least-recently-used first once it exceeds
+    ``max_bytes`` of vector data. The last ``max_queries`` query vectors are
+    also kept in memory, so a repeated question is embedded once, and
+    ``coalesce`` groups concurrent queries into one request.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        cache_path: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        lookup_batch_size: int = 500,
+        max_queries: int = 2048,
+        wave_window: float = 0.01,
+    ):
+        self.underlying = underlying
+        self.model = embedding_model_name(underlying)
+        self.max_bytes = max_bytes
+        self.lookup_batch_size = lookup_batch_size
+        self.hits = 0
+        self.misses = 0
+        # Recent query vectors, kept in memory only
+        self.max_queries = max_queries
+        self._queries = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.query_hits = 0
+        # Pending wave of queries (text -> Future) while coalescing, see coalesce()
+        self.wave_window = wave_window
+        self._wave = None
+        self.query_waves = 0
+
+        if os.path.dirname(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.cache_path = cache_path
+        self._connect()
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def _connect(self):
+        self._pid = os.getpid()
+        self._db = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # A SQLite connection must not be used across fork(): each worker
+        # process (e.g. under gunicorn's preload) opens its own
+        if self._pid != os.getpid():
+            self._connect()
+        return self._db
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        for start in range(0, len(keys), self.lookup_batch_size):
+            batch = keys[start:start + self.lookup_batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[key] = vector.tolist()
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+        return found
+
+    def _store(self, entries: Dict[str, List[float]]):
+        now = time.time()
+        rows = []
+        for key, vector in entries.items():
+            blob = array("f", vector).tobytes()
+            rows.append((key, self.model, blob, len(blob), now))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_used) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_used"):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", stale)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            cached = self._lookup(list(set(keys)))
+            self._conn.commit()
+
+            # Embed each missing text once, even if it repeats in the batch
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in cached:
+                    missing.setdefault(key, text)
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # The remote call runs unlocked, so other callers' cache hits are not held up behind it
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            # Round-trip through float32 so fresh and cached results match
+            fresh = {key: array("f", vector).tolist() for key, vector in zip(missing, vectors)}
+            with self._lock:
+                self._store(fresh)
+                self._conn.commit()
+            cached.update(fresh)
+        return [cached[key] for key in keys]
+
+    def _cached_query(self, text: str) -> Optional[List[float]]:
+        with self._query_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                self.query_hits += 1
+            return vector
+
+    def _remember_query(self, text: str, vector: List[float]):
+        with self._query_lock:
+            self._queries[text] = vector
+            self._queries.move_to_end(text)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+
+    @contextmanager
+    def coalesce(self):
+        """Send concurrent query embeddings together while the block runs.
+
+        Inside the block, an ``embed_query`` that misses the in-memory cache
+        waits ``wave_window`` seconds for other queries and all of them go
+        out in one ``embed_documents`` request. That gives the same vectors
+        as ``embed_query`` for symmetric models such as the OpenAI
+        embeddings used here. The block covers the threads and tasks started
+        from it with the current context (``asyncio`` tasks, LangChain's
+        executors, ``contextvars.copy_context().run``); unrelated queries
+        running at the same time are sent one by one with no added wait.
+        """
+        token = _coalescing.set(_coalescing.get() | {self})
+        try:
+            yield self
+        finally:
+            _coalescing.reset(token)
+
+    def _coalesced(self) -> bool:
+        return self in _coalescing.get()
+
+    def _embed_in_wave(self, text: str) -> List[float]:
+        with self._query_lock:
+            leader = self._wave is None
+            if leader:
+                self._wave = {}
+            wave = self._wave
+            future = wave.setdefault(text, Future())
+        if leader:
+            time.sleep(self.wave_window)
+            with self._query_lock:
+                self._wave = None
+            texts = list(wave)
+            try:
+                vectors = self.underlying.embed_documents(texts)
+            except BaseException as e:
+                for pending in wave.values():
+                    pending.set_exception(e)
+                raise
+            self.query_waves += 1
+            for wave_text, vector in zip(texts, vectors):
+                self._remember_query(wave_text, vector)
+                wave[wave_text].set_result(vector)
+        return future.result()
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._cached_query(text)
+        if vector is None and self._coalesced():
+            return self._embed_in_wave(text)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self._remember_query(text, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self._cached_query(text)
+        if vector is None and self._coalesced():
+            return await asyncio.to_thread(self._embed_in_wave, text)
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            self._remember_query(text, vector)
+        return vector
@@ -0,0 +1,225 @@
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pymupdf
+
+from .index import index_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Page titles of the primary statements in a 10-K
+STATEMENT_TITLES = {
+    "income": re.compile(r"CONSOLIDATED STATEMENTS OF (?:OPERATIONS|INCOME)\b"),
+    "balance": re.compile(r"CONSOLIDATED BALANCE SHEETS?\b"),
+    "cash_flow": re.compile(r"CONSOLIDATED STATEMENTS OF CASH FLOWS\b"),
+}
+
+_YEAR = re.compile(r"^(?:19|20)\d{2}$")
+_NUMBER = re.compile(r"^\(?-?\$?\s*[\d,]+(?:\.\d+)?\s*\)?$")
+_DASH = {"—", "–", "-"}
+
+
+def normalize_label(label: str) -> str:
+    """Lowercase a line-item label and strip punctuation, e.g. "Research and development"."""
+    label = label.lower().replace("’", "'").replace("&", " and ")
+    label = re.sub(r"[^a-z0-9:/ ]+", " ", label)
+    return re.sub(r"\s+", " ", label).strip()
+
+
+def _parse_value(token: str) -> Optional[float]:
+    token = token.strip()
+    if token in _DASH:
+        return 0.0
+    if not _NUMBER.match(token):
+        return None
+    negative = token.startswith("(") or token.startswith("-")
+    value = float(re.sub(r"[^\d.]", "", token))
+    return -value if negative else value
+
+
+class StatementTable:
+    """One financial statement as a dense item x period matrix.
+
+    ``values[i, j]`` is line item ``items[i]`` in fiscal year ``periods[j]``
+    (periods ascending, NaN where a filing did not report the item).
+    """
+
+    def __init__(self, periods: np.ndarray, items: List[str], values: np.ndarray):
+        self.periods = np.asarray(periods, dtype=np.int32)
+        self.items = list(items)
+        self.values = np.asarray(values, dtype=np.float64)
+        self._rows = {}
+        for row, item in enumerate(self.items):
+            self._rows.setdefault(item, row)
+            self._rows.setdefault(item.rsplit(": ", 1)[-1], row)
+
+    def row(self, *aliases: str) -> Optional[np.ndarray]:
+        """Values of the first line item matching any alias, across all periods."""
+        for alias in aliases:
+            row = self._rows.get(normalize_label(alias))
+            if row is not None:
+                return self.values[row]
+        return None
+
+    def merge(self, other: "StatementTable") -> "StatementTable":
+        """Union of periods and items; values from ``self`` win on overlap."""
+        periods = np.union1d(self.periods, other.periods)
+        items = self.items + [item for item in other.items if item not in self.items]
+        values = np.full((len(items), len(periods)), np.nan)
+        for table in (other, self):
+            rows = [items.index(item) for item in table.items]
+            cols = np.searchsorted(periods, table.periods)
+            values[np.ix_(rows, cols)] = np.where(
+                np.isnan(table.values), values[np.ix_(rows, cols)], table.values
+            )
+        return StatementTable(periods, items, values)
+
+
+def parse_statement_page(text: str) -> Optional[StatementTable]:
+    """Parse a statement page extracted with one cell per line.
+
+    Period headers are the year lines before the first line item. Each label
+    line starts a row and the numeric lines after it are its values; a label
+    ending in ":" (e.g. "Net sales:") qualifies the rows under it until the
+    next "Total ..." row.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    years = []
+    start = 0
+    for start, line in enumerate(lines):
+        if _YEAR.match(line):
+            years.append(int(line))
+        elif years and re.search(r"[A-Za-z]", line) and not re.match(r"^[A-Z][a-z]+ \d{1,2},$", line):
+            break
+    if not years:
+        return None
+
+    rows = []
+    header = None
+    label, values = None, []
+
+    def flush():
+        if label is not None and len(values) == len(years):
+            rows.append((label, values))
+
+    for line in lines[start:]:
+        if not line or line == "$":
+            continue
+        value = _parse_value(line)
+        if value is not None and label is not None:
+            values.append(value)
+            continue
+        if not re.search(r"[A-Za-z]", line):
+            continue
+        flush()
+        name = normalize_label(line)
+        if line.endswith(":"):
+            header, label, values = name.rstrip(":").strip(), None, []
+            continue
+        label = f"{header}: {name}" if header and not name.startswith("total") else name
+        values = []
+        if name.startswith("total"):
+            header = None
+    flush()
+
+    if not rows:
+        return None
+    # Columns are printed newest first; store periods ascending
+    order = np.argsort(years)
+    return StatementTable(
+        np.asarray(years)[order],
+        [label for label, _ in rows],
+        np.asarray([row for _, row in rows], dtype=np.float64)[:, order],
+    )
+
+
+def extract_statements(file_path: str) -> Dict[str, StatementTable]:
+    """Extract the income statement, balance sheet and cash flow statement."""
+    statements = {}
+    with pymupdf.open(file_path) as doc:
+        for page in doc:
+            text = page.get_text()
+            for name, title in STATEMENT_TITLES.items():
+                if name in statements or not title.search(text):
+                    continue
+                table = parse_statement_page(text)
+                if table is not None and len(table.items) >= 5:
+                    statements[name] = table
+    return statements
+
+
+class FinancialStore:
+    """Columnar store of statement tables per ticker, persisted as one .npz file."""
+
+    def __init__(self, tables: Optional[Dict[str, Dict[str, StatementTable]]] = None):
+        self.tables = tables or {}
+
+    @property
+    def tickers(self) -> List[str]:
+        return sorted(self.tables)
+
+    def add(self, ticker: str, statements: Dict[str, StatementTable]):
+        current = self.tables.setdefault(ticker, {})
+        for name, table in statements.items():
+            current[name] = table.merge(current[name]) if name in current else table
+
+    def statement(self, ticker: str, name: str) -> Optional[StatementTable]:
+        return self.tables.get(ticker, {}).get(name)
+
+    def save(self, path: str):
+        arrays = {}
+        for ticker, statements in self.tables.items():
+            for name, table in statements.items():
+                prefix = f"{ticker}/{name}"
+                arrays[f"{prefix}/periods"] = table.periods
+                arrays[f"{prefix}/items"] = np.asarray(table.items)
+                arrays[f"{prefix}/values"] = table.values
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FinancialStore":
+        store = cls()
+        with np.load(path) as data:
+            for key in data.files:
+                ticker, name, field = key.split("/")
+                if field != "values":
+                    continue
+                prefix = f"{ticker}/{name}"
+                store.tables.setdefault(ticker, {})[name] = StatementTable(
+                    data[f"{prefix}/periods"], data[f"{prefix}/items"].tolist(), data[f"{prefix}/values"]
+                )
+        return store
+
+
+def build_financial_store(loader) -> FinancialStore:
+    """Extract statements from every filing a (corpus) loader covers."""
+    store = FinancialStore()
+    filings = loader.filings() if hasattr(loader, "filings") else [loader]
+    # Oldest filings first so restated figures in newer filings win
+    filings = sorted(filings, key=lambda f: f.metadata.get("fiscal_year") or 0)
+    for filing in filings:
+        statements = extract_statements(filing.file_path)
+        if not statements:
+            logger.warning(f"No financial statements found in {filing.file_path}")
+            continue
+        store.add(filing.metadata.get("ticker") or os.path.basename(filing.file_path), statements)
+    return store
+
+
+def load_or_build_financial_store(loader, persist_dir: Optional[str] = None) -> FinancialStore:
+    """Load the statement store for these filings from disk, or extract and save it."""
+    if persist_dir is None:
+        return build_financial_store(loader)
+    fingerprint = index_fingerprint(loader.file_path, metadata=getattr(loader, "metadata", {}), kind="financials-v1")
+    path = os.path.join(persist_dir, f"financials_{fingerprint[:16]}.npz")
+    if os.path.exists(path):
+        return FinancialStore.load(path)
+    store = build_financial_store(loader)
+    os.makedirs(persist_dir, exist_ok=True)
+    store.save(path)
+    return store
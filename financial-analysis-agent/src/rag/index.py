@@ -0,0 +1,205 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from itertools import islice
+from typing import Iterable, Optional, Tuple
+
+from langchain_community.vectorstores import Qdrant
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as rest
+
+from .sections import SectionIndex
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# Bump when the stored payload layout changes so existing indexes are rebuilt
+INDEX_VERSION = 2
+
+
+def file_digest(file_path: str, block_size: int = 1 << 20) -> str:
+    """Return the sha256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digest(path: str) -> str:
+    """Digest a filing, or every file in a corpus directory (names included)."""
+    if not os.path.isdir(path):
+        return file_digest(path)
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            digest.update(file_digest(file_path).encode())
+    return digest.hexdigest()
+
+
+def embedding_model_name(embedding_model: Embeddings) -> str:
+    """Best-effort identifier of the model behind an embeddings object."""
+    return getattr(embedding_model, "model", None) or type(embedding_model).__name__
+
+
+def index_fingerprint(file_path: str, **params) -> str:
+    """Hash the source filing(s) together with the parameters used to index them.
+
+    Any change to the filing bytes, the chunking parameters or the embedding
+    model yields a different fingerprint, and therefore a fresh collection.
+    """
+    key = {"source": source_digest(file_path), **params}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def _read_manifest(persist_dir: str) -> dict:
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(persist_dir: str, manifest: dict):
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _manifest_entry(fingerprint: str, source: str, chunk_count: int, section_index: SectionIndex) -> dict:
+    return {
+        "fingerprint": fingerprint,
+        "source": source,
+        "chunks": chunk_count,
+        "sections": section_index.to_dict(),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def _require_chunks(chunk_count: int, source: str):
+    """Refuse to record an index of nothing, e.g. for a scanned PDF without a text layer."""
+    if chunk_count == 0:
+        raise ValueError(f"No text could be extracted from {source}; nothing to index")
+
+
+def _upsert_chunks(
+    client: QdrantClient,
+    collection_name: str,
+    chunks: Iterable[Document],
+    embedding_model: Embeddings,
+    section_index: SectionIndex,
+    batch_size: int = 64,
+) -> int:
+    """Embed and upload chunks batch by batch, creating the collection on first use.
+
+    Chunks are numbered in ingest order; the number is both the point id and
+    ``metadata["chunk_index"]``, and feeds the section -> chunk-range index.
+    """
+    count = 0
+    chunks = iter(chunks)
+    while batch := list(islice(chunks, batch_size)):
+        for i, chunk in enumerate(batch):
+            chunk.metadata["chunk_index"] = count + i
+            section_index.add(count + i, chunk.metadata.get("section"))
+        texts = [chunk.page_content for chunk in batch]
+        vectors = embedding_model.embed_documents(texts)
+        if count == 0:
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=rest.VectorParams(
+                    size=len(vectors[0]), distance=rest.Distance.COSINE
+                ),
+            )
+        client.upsert(
+            collection_name=collection_name,
+            points=[
+                rest.PointStruct(
+                    id=count + i,
+                    vector=vector,
+                    payload={
+                        Qdrant.CONTENT_KEY: text,
+                        Qdrant.METADATA_KEY: chunk.metadata,
+                    },
+                )
+                for i, (chunk, text, vector) in enumerate(zip(batch, texts, vectors))
+            ],
+        )
+        count += len(batch)
+    return count
+
+
+def load_or_build_vectorstore(
+    loader,
+    embedding_model: Embeddings,
+    collection_prefix: str,
+    persist_dir: Optional[str] = None,
+) -> Tuple[Qdrant, dict]:
+    """Open the persisted collection for this filing, or build it.
+
+    With no ``persist_dir`` the collection lives in memory and is rebuilt on
+    every call. Otherwise the collection name carries the index fingerprint
+    and is only reused once its build has completed and been recorded in the
+    manifest, so an interrupted build is never served.
+
+    Returns the vectorstore and its manifest entry (fingerprint, chunk count
+    and section index).
+    """
+    fingerprint = index_fingerprint(
+        loader.file_path,
+        chunk_size=loader.chunk_size,
+        chunk_overlap=loader.chunk_overlap,
+        metadata=getattr(loader, "metadata", {}),
+        embedding_model=embedding_model_name(embedding_model),
+        index_version=INDEX_VERSION,
+    )
+    collection_name = f"{collection_prefix}_{fingerprint[:16]}"
+
+    if persist_dir is None:
+        client = QdrantClient(location=":memory:")
+        section_index = SectionIndex()
+        chunk_count = _upsert_chunks(client, collection_name, loader.iter_chunks(), embedding_model, section_index)
+        _require_chunks(chunk_count, loader.file_path)
+        entry = _manifest_entry(fingerprint, loader.file_path, chunk_count, section_index)
+        return Qdrant(client, collection_name, embedding_model), entry
+
+    os.makedirs(persist_dir, exist_ok=True)
+    client = QdrantClient(path=persist_dir)
+    manifest = _read_manifest(persist_dir)
+
+    entry = manifest.get(collection_name)
+    if (
+        entry
+        and entry.get("fingerprint") == fingerprint
+        and client.collection_exists(collection_name)
+    ):
+        logger.info(f"Reusing vector index {collection_name} ({entry['chunks']} chunks)")
+        return Qdrant(client, collection_name, embedding_model), entry
+
+    # Drop stale or partially built collections for this filing
+    for collection in client.get_collections().collections:
+        if collection.name == collection_prefix or collection.name.startswith(f"{collection_prefix}_"):
+            client.delete_collection(collection.name)
+            manifest.pop(collection.name, None)
+
+    logger.info(f"Building vector index {collection_name} from {loader.file_path}")
+    started = time.perf_counter()
+    section_index = SectionIndex()
+    chunk_count = _upsert_chunks(client, collection_name, loader.iter_chunks(), embedding_model, section_index)
+    # The collection is created with the first batch, so there is none to record
+    _require_chunks(chunk_count, loader.file_path)
+
+    entry = _manifest_entry(fingerprint, loader.file_path, chunk_count, section_index)
+    manifest[collection_name] = entry
+    _write_manifest(persist_dir, manifest)
+    logger.info(f"Built {collection_name} with {chunk_count} chunks in {time.perf_counter() - started:.1f}s")
+
+    return Qdrant(client, collection_name, embedding_model), entry
@@ -0,0 +1,283 @@
+import glob
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import Qdrant
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from qdrant_client.http import models as rest
+
+from .corpus import MetadataColumns
+
+logger = logging.getLogger(__name__)
+
+# Bump when tokenization or the on-disk layout changes
+KEYWORD_INDEX_VERSION = 1
+
+# Figures keep their digits together ("391,035" -> "391035", "1.5"), words
+# keep inner apostrophes ("company's")
+_TOKEN = re.compile(r"\d[\d,]*(?:\.\d+)?|[a-z]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "what which who will with how does did do".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms for keyword matching, with plurals folded onto the singular."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if token[0].isdigit():
+            token = token.replace(",", "").rstrip(".")
+        elif token.endswith("'s"):
+            token = token[:-2]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KeywordIndex:
+    """BM25 inverted index over the chunks of one vector collection.
+
+    Postings are stored CSR style: the documents containing term ``t`` are
+    ``doc_ids[offsets[t]:offsets[t + 1]]`` with matching term frequencies.
+    Document ids are chunk indices, the same ids the Qdrant points use, so
+    results from both indexes can be fused directly.
+    """
+
+    def __init__(
+        self,
+        vocabulary: List[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        texts: List[str],
+        metadatas: List[dict],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.term_freqs = np.asarray(term_freqs, dtype=np.float32)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas)
+        self.k1 = k1
+        self.b = b
+
+        doc_count = len(self.texts)
+        doc_freqs = np.diff(self.offsets)
+        self.idf = np.log1p((doc_count - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        average_length = self.doc_lengths.mean() if doc_count else 1.0
+        # Per-document BM25 length normalisation, computed once
+        self._norms = (k1 * (1 - b + b * self.doc_lengths / max(average_length, 1.0))).astype(np.float32)
+        self._filter = MetadataColumns(self.metadatas)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @classmethod
+    def from_documents(cls, documents: List[Document]) -> "KeywordIndex":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lengths = []
+        for doc_id, document in enumerate(documents):
+            counts = Counter(tokenize(document.page_content))
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((doc_id, count))
+
+        vocabulary = sorted(postings)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in vocabulary])
+        pairs = np.asarray(
+            [pair for term in vocabulary for pair in postings[term]], dtype=np.int64
+        ).reshape(-1, 2)
+        return cls(
+            vocabulary,
+            offsets,
+            pairs[:, 0],
+            pairs[:, 1],
+            np.asarray(doc_lengths),
+            [document.page_content for document in documents],
+            [document.metadata for document in documents],
+        )
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query`` (zero where no term matches)."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term, query_count in Counter(tokenize(query)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, stop = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.term_freqs[start:stop]
+            scores[docs] += query_count * self.idf[term_id] * tf * (self.k1 + 1) / (tf + self._norms[docs])
+        return scores
+
+    def search(self, query: str, k: int = 4, filter: Optional[rest.Filter] = None) -> List[Tuple[Document, float]]:
+        """Top ``k`` matching chunks, restricted to those passing a Qdrant ``filter``."""
+        scores = self.scores(query)
+        if filter is not None:
+            scores[~self._filter.mask(filter)] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.document(int(doc_id)), float(scores[doc_id])) for doc_id in candidates]
+
+    def document(self, doc_id: int) -> Document:
+        return Document(page_content=self.texts[doc_id], metadata=dict(self.metadatas[doc_id]))
+
+    def save(self, path: str):
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            version=np.asarray(KEYWORD_INDEX_VERSION),
+            vocabulary=np.asarray(vocabulary, dtype=str),
+            offsets=self.offsets,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+            texts=np.asarray(self.texts, dtype=str),
+            metadatas=np.asarray([json.dumps(m) for m in self.metadatas], dtype=str),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["KeywordIndex"]:
+        """Load a saved index, or ``None`` if it was written by another version."""
+        with np.load(path) as data:
+            if int(data["version"]) != KEYWORD_INDEX_VERSION:
+                return None
+            return cls(
+                data["vocabulary"].tolist(),
+                data["offsets"],
+                data["doc_ids"],
+                data["term_freqs"],
+                data["doc_lengths"],
+                data["texts"].tolist(),
+                [json.loads(m) for m in data["metadatas"].tolist()],
+            )
+
+
+def _collection_documents(vectorstore: VectorStore, page_size: int = 1000) -> List[Document]:
+    """Every chunk stored in the collection, in chunk-index order."""
+    if not isinstance(vectorstore, Qdrant):
+        # In-process indexes hold their chunks directly
+        return vectorstore.documents()
+    client, name = vectorstore.client, vectorstore.collection_name
+    points, offset = [], None
+    while True:
+        page, offset = client.scroll(name, limit=page_size, offset=offset, with_payload=True, with_vectors=False)
+        points.extend(page)
+        if offset is None:
+            break
+    points.sort(key=lambda point: point.id)
+    return [
+        Document(
+            page_content=point.payload[Qdrant.CONTENT_KEY],
+            metadata=point.payload.get(Qdrant.METADATA_KEY) or {},
+        )
+        for point in points
+    ]
+
+
+def load_or_build_keyword_index(
+    vectorstore: VectorStore, collection_prefix: str, persist_dir: Optional[str] = None
+) -> KeywordIndex:
+    """Open the keyword index saved next to a collection, or build it from the collection.
+
+    The index file is named after the collection, so it is rebuilt whenever
+    the collection's fingerprint changes; indexes of stale collections for
+    the same filing are removed.
+    """
+    if persist_dir is None:
+        return KeywordIndex.from_documents(_collection_documents(vectorstore))
+
+    path = os.path.join(persist_dir, f"keywords_{vectorstore.collection_name}.npz")
+    if os.path.exists(path):
+        index = KeywordIndex.load(path)
+        if index is not None:
+            return index
+
+    for stale in glob.glob(os.path.join(persist_dir, f"keywords_{collection_prefix}_*.npz")):
+        if stale != path:
+            os.remove(stale)
+
+    index = KeywordIndex.from_documents(_collection_documents(vectorstore))
+    index.save(path)
+    logger.info(f"Built keyword index for {vectorstore.collection_name} ({len(index.vocabulary)} terms)")
+    return index
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse dense vector search with BM25 keyword search.
+
+    Each side returns its top ``fetch_k`` chunks under the same
+    ``search_kwargs["filter"]``; the lists are merged with reciprocal rank
+    fusion (``weight / (rrf_k + rank)`` summed per chunk) and the top
+    ``search_kwargs["k"]`` are returned. Exact figures and line-item names
+    are found by the keyword side even when their embeddings are not close
+    to the question's.
+    """
+
+    vectorstore: VectorStore
+    keyword_index: KeywordIndex
+    search_kwargs: dict = {"k": 4}
+    fetch_k: int = 20
+    rrf_k: int = 60
+    vector_weight: float = 1.0
+    keyword_weight: float = 1.0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        k = self.search_kwargs.get("k", 4)
+        search_filter = self.search_kwargs.get("filter")
+        fetch_k = max(self.fetch_k, k)
+
+        vector_hits = self.vectorstore.similarity_search(query, k=fetch_k, filter=search_filter)
+        keyword_hits = [doc for doc, _ in self.keyword_index.search(query, k=fetch_k, filter=search_filter)]
+        return self._fuse(vector_hits, keyword_hits, k)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        k = self.search_kwargs.get("k", 4)
+        search_filter = self.search_kwargs.get("filter")
+        fetch_k = max(self.fetch_k, k)
+
+        # Only the query embedding waits on the network; both searches are in-process
+        embedding = await self.vectorstore.embeddings.aembed_query(query)
+        vector_hits = self.vectorstore.similarity_search_by_vector(embedding, k=fetch_k, filter=search_filter)
+        keyword_hits = [doc for doc, _ in self.keyword_index.search(query, k=fetch_k, filter=search_filter)]
+        return self._fuse(vector_hits, keyword_hits, k)
+
+    def _fuse(self, vector_hits: List[Document], keyword_hits: List[Document], k: int) -> List[Document]:
+        fused: Dict[int, float] = {}
+        documents: Dict[int, Document] = {}
+        for hits, weight in ((vector_hits, self.vector_weight), (keyword_hits, self.keyword_weight)):
+            for rank, doc in enumerate(hits):
+                key = doc.metadata.get("chunk_index", id(doc))
+                fused[key] = fused.get(key, 0.0) + weight / (self.rrf_k + rank + 1)
+                documents.setdefault(key, doc)
+
+        ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+        return [documents[key] for key in ranked]
@@ -1,26 +1,164 @@
+import functools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 from langchain.document_loaders import PyMuPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import tiktoken
+from langchain_core.documents import Document
+import pymupdf
+from .splitter import TokenAwareTextSplitter, TokenCounter, get_encoder
+from .sections import SectionTagger, page_headings
+
+def _page_documents(doc: pymupdf.Document, file_path: str, start: int, stop: int) -> List[Document]:
+    """Text of pages [start, stop) of an open PDF.
+
+    Mirrors the per-page documents produced by PyMuPDFLoader so both ingestion
+    paths split into identical chunks.
+    """
+    doc_metadata = {k: v for k, v in doc.metadata.items() if type(v) in [str, int]}
+    return [
+        Document(
+            page_content=doc[number].get_text(),
+            metadata=dict(
+                {
+                    "source": file_path,
+                    "file_path": file_path,
+                    "page": number,
+                    "total_pages": len(doc),
+                },
+                **doc_metadata,
+            ),
+        )
+        for number in range(start, stop)
+    ]
+
+def _extract_pages(file_path: str, start: int, stop: int) -> List[Document]:
+    """Extract the text of pages [start, stop) in a worker process."""
+    with pymupdf.open(file_path) as doc:
+        return _page_documents(doc, file_path, start, stop)
+
+@functools.lru_cache(maxsize=4)
+def _worker_splitter(chunk_size: int, chunk_overlap: int) -> TokenAwareTextSplitter:
+    # One splitter per worker process, so token counts are memoised across its tasks;
+    # the process pool already provides the parallelism
+    return TokenAwareTextSplitter(
+        counter=TokenCounter("gpt-4", num_threads=1),
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+def _split_range(
+    file_path: str, start: int, stop: int, chunk_size: int, chunk_overlap: int
+) -> List[Tuple[List[str], List[Document]]]:
+    """Extract and split pages [start, stop); runs inside a worker process.
+
+    Returns each page's section headings with its chunks. Sections carry
+    across pages, so the caller tags them in page order; only the chunks
+    (not the page text) travel back to it.
+    """
+    text_splitter = _worker_splitter(chunk_size, chunk_overlap)
+    return [
+        (page_headings(page.page_content), text_splitter.split_documents([page]))
+        for page in _extract_pages(file_path, start, stop)
+    ]
 
 class DocumentLoader:
-    def __init__(self, file_path: str):
+    def __init__(
+        self,
+        file_path: str,
+        chunk_size: int = 300,
+        chunk_overlap: int = 0,
+        metadata: Optional[dict] = None,
+    ):
         self.file_path = file_path
+        # Filing-level fields (ticker, form type, ...) added to every chunk
+        self.metadata = metadata or {}
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._token_counter = None
         
     @staticmethod
     def tiktoken_len(text):
-        tokens = tiktoken.encoding_for_model("gpt-4").encode(text)
+        tokens = get_encoder("gpt-4").encode(text)
         return len(tokens)
         
+    def _text_splitter(self):
+        # Token counts are memoised per loader and shared across pages
+        if self._token_counter is None:
+            self._token_counter = TokenCounter("gpt-4")
+        return TokenAwareTextSplitter(
+            counter=self._token_counter,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+        )
+
+    def _label(self, tagger: SectionTagger, headings: List[str], chunks: List[Document]) -> List[Document]:
+        """Label one page's chunks with its 10-K section and the filing metadata."""
+        tagger.tag_chunks(headings, chunks)
+        for chunk in chunks:
+            chunk.metadata.update(self.metadata)
+        return chunks
+
+    def _split_pages(self, text_splitter, tagger: SectionTagger, pages: List[Document]) -> Iterator[Document]:
+        """Split pages one by one, labelling chunks with filing metadata and 10-K section."""
+        for page in pages:
+            yield from self._label(tagger, page_headings(page.page_content), text_splitter.split_documents([page]))
+
     def load_and_split(self):
         # Load document
         docs = PyMuPDFLoader(self.file_path).load()
         
         # Create text splitter
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=300,
-            chunk_overlap=0,
-            length_function=self.tiktoken_len,
-        )
+        text_splitter = self._text_splitter()
         
         # Split documents
-        return text_splitter.split_documents(docs)
\ No newline at end of file
+        return list(self._split_pages(text_splitter, SectionTagger(), docs))
+
+    def iter_chunks(
+        self,
+        workers: Optional[int] = None,
+        pages_per_task: int = 8,
+        max_pending: Optional[int] = None,
+    ) -> Iterator[Document]:
+        """Stream chunks in page order while pages are processed in parallel.
+
+        Page ranges are extracted and split (the token counting included) in
+        a process pool; only tagging sections, which carry from page to page,
+        runs here. At most ``max_pending`` ranges are in flight, so memory
+        stays flat regardless of filing size and consumers (e.g. embedding)
+        start on the first chunks before the rest are split. With one worker
+        (the default on a single CPU) everything runs in this process.
+        Produces the same chunks as ``load_and_split``.
+        """
+        with pymupdf.open(self.file_path) as doc:
+            total_pages = len(doc)
+        ranges = iter([
+            (start, min(start + pages_per_task, total_pages))
+            for start in range(0, total_pages, pages_per_task)
+        ])
+        tagger = SectionTagger()
+        workers = workers or os.cpu_count() or 1
+
+        if workers == 1 or total_pages <= pages_per_task:
+            text_splitter = self._text_splitter()
+            with pymupdf.open(self.file_path) as doc:
+                for start, stop in ranges:
+                    pages = _page_documents(doc, self.file_path, start, stop)
+                    yield from self._split_pages(text_splitter, tagger, pages)
+            return
+
+        split = functools.partial(_split_range, self.file_path, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        max_pending = max_pending or 2 * workers
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start, stop in ranges:
+                pending.append(pool.submit(split, start, stop))
+                if len(pending) >= max_pending:
+                    break
+            while pending:
+                pages = pending.popleft().result()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    pending.append(pool.submit(split, *next_range))
+                for headings, chunks in pages:
+                    yield from self._label(tagger, headings, chunks)
\ No newline at end of file
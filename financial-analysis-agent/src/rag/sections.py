@@ -0,0 +1,135 @@
+import re
+from typing import Dict, List, Optional
+
+# Standard 10-K item titles, used to label sections consistently
+ITEM_TITLES = {
+    "1": "Business",
+    "1A": "Risk Factors",
+    "1B": "Unresolved Staff Comments",
+    "1C": "Cybersecurity",
+    "2": "Properties",
+    "3": "Legal Proceedings",
+    "4": "Mine Safety Disclosures",
+    "5": "Market for Registrant's Common Equity, Related Stockholder Matters and Issuer Purchases of Equity Securities",
+    "6": "[Reserved]",
+    "7": "Management's Discussion and Analysis of Financial Condition and Results of Operations",
+    "7A": "Quantitative and Qualitative Disclosures About Market Risk",
+    "8": "Financial Statements and Supplementary Data",
+    "9": "Changes in and Disagreements with Accountants on Accounting and Financial Disclosure",
+    "9A": "Controls and Procedures",
+    "9B": "Other Information",
+    "9C": "Disclosure Regarding Foreign Jurisdictions that Prevent Inspections",
+    "10": "Directors, Executive Officers and Corporate Governance",
+    "11": "Executive Compensation",
+    "12": "Security Ownership of Certain Beneficial Owners and Management and Related Stockholder Matters",
+    "13": "Certain Relationships and Related Transactions, and Director Independence",
+    "14": "Principal Accountant Fees and Services",
+    "15": "Exhibit and Financial Statement Schedules",
+    "16": "Form 10-K Summary",
+}
+
+# Front matter before the first Item heading (cover page, table of contents)
+FRONT_MATTER = "Cover"
+# Everything from the signature page on (signatures and filed exhibits)
+BACK_MATTER = "Exhibits"
+
+# A heading is a line holding only "Item 7." -- cross references like
+# "Part II, Item 7 of this Form 10-K" never end the line with the label
+_HEADING = re.compile(r"^[ \t]*item[ \t]+(\d{1,2}[a-c]?)\.[ \t]*$", re.IGNORECASE | re.MULTILINE)
+_SIGNATURES = re.compile(r"^[ \t]*SIGNATURES[ \t]*$", re.MULTILINE)
+
+# Query phrases that pin a question to one section. Order matters: market
+# risk questions belong to 7A, not to the generic risk factors in 1A.
+_QUERY_SECTIONS = [
+    ("Item 7A", re.compile(r"market risk|interest rate risk|foreign (?:currency|exchange) risk", re.I)),
+    ("Item 1A", re.compile(r"\brisk factors?\b|\b(?:main|key|principal|major) risks?\b", re.I)),
+    ("Item 1C", re.compile(r"cybersecurity", re.I)),
+    ("Item 3", re.compile(r"legal proceedings|litigation", re.I)),
+    ("Item 7", re.compile(r"md&a|management.s discussion|results of operations|liquidity and capital", re.I)),
+    ("Item 8", re.compile(
+        r"balance sheets?|income statements?|statements? of (?:operations|cash flows|comprehensive income"
+        r"|shareholders.? equity)|cash flow statements?|financial statements|notes to (?:the )?consolidated", re.I)),
+    ("Item 9A", re.compile(r"internal control|controls and procedures", re.I)),
+    ("Item 11", re.compile(r"executive compensation", re.I)),
+]
+
+
+def normalize_section(name: str) -> Optional[str]:
+    """Map "1A", "item 1a" or "Risk Factors" to the canonical "Item 1A"."""
+    label = re.sub(r"^\s*item\s+", "", name.strip(), flags=re.I).rstrip(".").upper()
+    if label in ITEM_TITLES:
+        return f"Item {label}"
+    for item, title in ITEM_TITLES.items():
+        if name.strip().lower() == title.lower():
+            return f"Item {item}"
+    for special in (FRONT_MATTER, BACK_MATTER):
+        if name.strip().lower() == special.lower():
+            return special
+    return None
+
+
+def infer_section(query: str) -> Optional[str]:
+    """Return the 10-K section a question is clearly about, if any."""
+    for section, pattern in _QUERY_SECTIONS:
+        if pattern.search(query):
+            return section
+    return None
+
+
+def page_headings(page_text: str) -> List[str]:
+    """Item labels with a heading on the page; none for a table of contents page."""
+    headings = [match.upper() for match in _HEADING.findall(page_text)]
+    if "1" in headings and len(set(headings)) >= 5:
+        return []
+    return headings
+
+
+class SectionTagger:
+    """Label chunks with the 10-K Item they fall under.
+
+    Feed pages in order; the current section carries across page breaks.
+    Pages listing Item 1 alongside several other items are treated as the
+    table of contents and do not move the current section.
+    """
+
+    def __init__(self):
+        self.section = FRONT_MATTER
+
+    def tag(self, page_text: str, chunks: list):
+        self.tag_chunks(page_headings(page_text), chunks)
+
+    def tag_chunks(self, headings: List[str], chunks: list):
+        """Tag one page's chunks given its ``page_headings`` (the page text itself is not needed)."""
+        for chunk in chunks:
+            for item in _HEADING.findall(chunk.page_content):
+                if item.upper() in headings:
+                    self.section = f"Item {item.upper()}"
+            if self.section != FRONT_MATTER and _SIGNATURES.search(chunk.page_content):
+                self.section = BACK_MATTER
+            chunk.metadata["section"] = self.section
+
+
+class SectionIndex:
+    """Precomputed section -> chunk-range index.
+
+    Chunks are numbered in ingest order, so each section of each filing is a
+    contiguous ``[start, stop)`` range of chunk indices.
+    """
+
+    def __init__(self, ranges: Optional[Dict[str, List[List[int]]]] = None):
+        self.ranges = ranges or {}
+        self._last = None
+
+    def add(self, chunk_index: int, section: str):
+        spans = self.ranges.setdefault(section, [])
+        if self._last == section and spans and spans[-1][1] == chunk_index:
+            spans[-1][1] = chunk_index + 1
+        else:
+            spans.append([chunk_index, chunk_index + 1])
+        self._last = section
+
+    def get(self, section: str) -> List[List[int]]:
+        return self.ranges.get(section, [])
+
+    def to_dict(self) -> Dict[str, List[List[int]]]:
+        return self.ranges
@@ -0,0 +1,145 @@
+import functools
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_text_splitters.character import _split_text_with_regex
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(model: str = "gpt-4") -> tiktoken.Encoding:
+    """Return the tiktoken encoder for a model, loaded once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+# Token-counting pools by (process, size), shared by every TokenCounter
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _shared_pool(num_threads: int) -> ThreadPoolExecutor:
+    """Thread pool of ``num_threads`` for this process, created on first use.
+
+    Keyed by PID too: a forked child (e.g. a gunicorn worker) does not
+    inherit the parent's threads, so it gets a pool of its own.
+    """
+    key = (os.getpid(), num_threads)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ThreadPoolExecutor(num_threads, thread_name_prefix="token-count")
+        return pool
+
+
+class TokenCounter:
+    """Memoised, batch-capable token length function.
+
+    Drop-in ``length_function`` for text splitters: counts are cached by text,
+    so pieces the recursive splitter measures repeatedly are tokenized once,
+    and ``prime`` tokenizes a list of pieces in parallel on a thread pool
+    shared by all counters (tiktoken releases the GIL while encoding).
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-4",
+        num_threads: int = 4,
+        min_batch: int = 64,
+        max_entries: int = 200_000,
+    ):
+        self.encoder = get_encoder(model)
+        self.num_threads = num_threads
+        self.min_batch = min_batch
+        self.max_entries = max_entries
+        self._counts = {}
+
+    def __call__(self, text: str) -> int:
+        count = self._counts.get(text)
+        if count is None:
+            count = len(self.encoder.encode(text))
+            self._remember(text, count)
+        return count
+
+    def _remember(self, text: str, count: int):
+        if len(self._counts) >= self.max_entries:
+            self._counts.clear()
+        self._counts[text] = count
+
+    def _count_slice(self, texts: List[str]) -> List[int]:
+        encode = self.encoder.encode
+        return [len(encode(text)) for text in texts]
+
+    def prime(self, texts: Iterable[str]):
+        """Count every not-yet-seen text, in parallel for large batches."""
+        missing = [text for text in dict.fromkeys(texts) if text not in self._counts]
+        if not missing:
+            return
+        if self.num_threads <= 1 or len(missing) < self.min_batch:
+            counts = self._count_slice(missing)
+        else:
+            step = -(-len(missing) // self.num_threads)
+            slices = [missing[i:i + step] for i in range(0, len(missing), step)]
+            pool = _shared_pool(self.num_threads)
+            counts = [count for part in pool.map(self._count_slice, slices) for count in part]
+        for text, count in zip(missing, counts):
+            self._remember(text, count)
+
+    def clear(self):
+        self._counts.clear()
+
+
+class TokenAwareTextSplitter(RecursiveCharacterTextSplitter):
+    """RecursiveCharacterTextSplitter that measures pieces with a TokenCounter.
+
+    ``_split_text`` follows the upstream algorithm step for step; the only
+    difference is that each level's splits are counted in one batch before
+    the merge loop, so the chunks are identical to the plain splitter's.
+    """
+
+    def __init__(self, counter: TokenCounter = None, **kwargs):
+        counter = counter or TokenCounter()
+        super().__init__(length_function=counter, **kwargs)
+        self.counter = counter
+
+    def _split_text(self, text: str, separators: List[str]) -> List[str]:
+        final_chunks = []
+        # Get appropriate separator to use
+        separator = separators[-1]
+        new_separators = []
+        for i, _s in enumerate(separators):
+            _separator = _s if self._is_separator_regex else re.escape(_s)
+            if _s == "":
+                separator = _s
+                break
+            if re.search(_separator, text):
+                separator = _s
+                new_separators = separators[i + 1:]
+                break
+
+        _separator = separator if self._is_separator_regex else re.escape(separator)
+        splits = _split_text_with_regex(text, _separator, self._keep_separator)
+        _separator = "" if self._keep_separator else separator
+
+        # Count this level's pieces (and the join separator) in one batch
+        self.counter.prime([_separator, *splits])
+
+        # Now go merging things, recursively splitting longer texts.
+        _good_splits = []
+        for s in splits:
+            if self._length_function(s) < self._chunk_size:
+                _good_splits.append(s)
+            else:
+                if _good_splits:
+                    final_chunks.extend(self._merge_splits(_good_splits, _separator))
+                    _good_splits = []
+                if not new_separators:
+                    final_chunks.append(s)
+                else:
+                    final_chunks.extend(self._split_text(s, new_separators))
+        if _good_splits:
+            final_chunks.extend(self._merge_splits(_good_splits, _separator))
+        return final_chunks
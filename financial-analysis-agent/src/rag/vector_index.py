@@ -0,0 +1,361 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from itertools import islice
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from qdrant_client.http import models as rest
+
+from .corpus import MetadataColumns
+from .index import (
+    INDEX_VERSION,
+    _manifest_entry,
+    _read_manifest,
+    _require_chunks,
+    _write_manifest,
+    embedding_model_name,
+    index_fingerprint,
+)
+from .sections import SectionIndex
+
+logger = logging.getLogger(__name__)
+
+# Quantized indexes live in their own directory under persist_dir
+QUANTIZED_DIR = "quantized"
+
+# Rows converted to float32 per step when scoring, bounding the temporary buffer
+_BLOCK_ROWS = 4096
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize(vectors: np.ndarray, dtype: str = "int8") -> Tuple[np.ndarray, np.ndarray]:
+    """Unit-normalise rows and store them as int8 (scaled per row) or float16.
+
+    Returns the quantized matrix and the per-row scale that maps it back to
+    floats (all ones for float16).
+    """
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    if dtype != "int8":
+        raise ValueError(f"Unsupported quantization dtype: {dtype}")
+    peaks = np.abs(vectors).max(axis=1, initial=0)
+    scales = np.where(peaks == 0, 1.0, peaks / 127.0).astype(np.float32)
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales
+
+
+class QuantizedVectorIndex(VectorStore):
+    """In-process cosine index over contiguous quantized numpy matrices.
+
+    Vectors are unit-normalised and stored as int8 (1 byte per dimension,
+    about a quarter of float32) or float16; search is one matrix-vector
+    product over the rows a filter leaves, followed by an argpartition
+    top-k. When the full-precision matrix is available (memory-mapped from
+    disk for persisted indexes) the best ``k * rescore_factor`` candidates
+    are re-ranked with exact float32 scores.
+
+    Row ``i`` is chunk index ``i``, so section filters (chunk-index ranges)
+    select contiguous slices. Implements the ``VectorStore`` interface, so
+    ``as_retriever()`` and ``HybridRetriever`` work unchanged.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        vectors: np.ndarray,
+        scales: np.ndarray,
+        texts: List[str],
+        metadatas: List[dict],
+        full_vectors: Optional[np.ndarray] = None,
+        collection_name: str = "quantized",
+        rescore_factor: int = 4,
+    ):
+        self.embedding = embedding
+        self.vectors = vectors
+        self.scales = np.asarray(scales, dtype=np.float32)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas)
+        self.full_vectors = full_vectors
+        self.collection_name = collection_name
+        self.rescore_factor = rescore_factor
+        self._filter = MetadataColumns(self.metadatas)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the quantized matrix and its scales, plus the full vectors when held in memory."""
+        size = self.vectors.nbytes + self.scales.nbytes
+        # Memory-mapped full vectors are file pages the OS can drop, not heap
+        if self.full_vectors is not None and not isinstance(self.full_vectors, np.memmap):
+            size += self.full_vectors.nbytes
+        return size
+
+    def documents(self) -> List[Document]:
+        return [self._document(i) for i in range(len(self))]
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self.texts[row], metadata=dict(self.metadatas[row]))
+
+    def _scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Approximate cosine scores for ``rows`` (all rows when ``None``)."""
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        scales = self.scales if rows is None else self.scales[rows]
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), _BLOCK_ROWS):
+            block = vectors[start:start + _BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores * scales
+
+    def _rows(self, filter: Optional[rest.Filter]) -> Optional[np.ndarray]:
+        if filter is None:
+            return None
+        return np.flatnonzero(self._filter.mask(filter))
+
+    def search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[rest.Filter] = None
+    ) -> List[Tuple[int, float]]:
+        """Top ``k`` ``(row, cosine)`` pairs for a query vector."""
+        if k <= 0 or len(self) == 0:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        rows = self._rows(filter)
+        if rows is not None and len(rows) == 0:
+            return []
+        scores = self._scores(rows, query)
+
+        # Shortlist with the quantized scores, then rescore exactly if possible
+        rescore = self.full_vectors is not None and self.rescore_factor > 1
+        shortlist = min(len(scores), k * self.rescore_factor if rescore else k)
+        candidates = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        ids = candidates if rows is None else rows[candidates]
+        if rescore:
+            scores = np.asarray(self.full_vectors[np.sort(ids)], dtype=np.float32) @ query
+            ids = np.sort(ids)
+        else:
+            scores = scores[candidates]
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[rest.Filter] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        hits = self.search_by_vector(self.embedding.embed_query(query), k=k, filter=filter)
+        return [(self._document(row), score) for row, score in hits]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[rest.Filter] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[rest.Filter] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = await self.embedding.aembed_query(query)
+        return [(self._document(row), score) for row, score in self.search_by_vector(embedding, k=k, filter=filter)]
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, filter: Optional[rest.Filter] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[rest.Filter] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [self._document(row) for row, _ in self.search_by_vector(embedding, k=k, filter=filter)]
+
+    def _similarity_search_with_relevance_scores(self, query: str, k: int = 4, **kwargs: Any):
+        # Cosine in [-1, 1] -> relevance in [0, 1]
+        return [(doc, (score + 1) / 2) for doc, score in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        start = len(self)
+        vectors, scales = quantize(self.embedding.embed_documents(texts), self.vectors.dtype.name)
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.scales = np.concatenate([self.scales, scales])
+        # Appended rows have no full-precision copy on disk; stop rescoring
+        self.full_vectors = None
+        self.texts.extend(texts)
+        self.metadatas.extend(metadatas)
+        self._filter = MetadataColumns(self.metadatas)
+        return [str(i) for i in range(start, len(self))]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        dtype: str = "int8",
+        keep_full: bool = False,
+        **kwargs: Any,
+    ) -> "QuantizedVectorIndex":
+        full = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        if not texts:
+            # The dimension is unknown without a single embedding
+            full = full.reshape(0, 0)
+        vectors, scales = quantize(full, dtype)
+        return cls(
+            embedding,
+            vectors,
+            scales,
+            texts,
+            metadatas or [{} for _ in texts],
+            full_vectors=_normalize(full) if keep_full else None,
+            **kwargs,
+        )
+
+    def save(self, directory: str):
+        """Write the index as plain .npy files (memory-mappable) plus a JSON payload file."""
+        tmp_dir = directory + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "vectors.npy"), self.vectors)
+        np.save(os.path.join(tmp_dir, "scales.npy"), self.scales)
+        if self.full_vectors is not None:
+            np.save(os.path.join(tmp_dir, "full.npy"), np.asarray(self.full_vectors, dtype=np.float32))
+        with open(os.path.join(tmp_dir, "payloads.json"), "w") as f:
+            json.dump({"texts": self.texts, "metadatas": self.metadatas}, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings, **kwargs: Any) -> "QuantizedVectorIndex":
+        """Open a saved index; matrices are memory-mapped, so processes share their pages."""
+        full_path = os.path.join(directory, "full.npy")
+        with open(os.path.join(directory, "payloads.json")) as f:
+            payloads = json.load(f)
+        return cls(
+            embedding,
+            np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r"),
+            np.load(os.path.join(directory, "scales.npy")),
+            payloads["texts"],
+            payloads["metadatas"],
+            full_vectors=np.load(full_path, mmap_mode="r") if os.path.exists(full_path) else None,
+            collection_name=os.path.basename(directory),
+            **kwargs,
+        )
+
+
+def _spill(vectors: np.ndarray) -> Optional[np.ndarray]:
+    """Move ``vectors`` to a memory map over an anonymous temporary file, off the heap."""
+    if vectors.size == 0:
+        return None
+    with tempfile.TemporaryFile() as f:
+        spilled = np.memmap(f, dtype=np.float32, mode="w+", shape=vectors.shape)
+        spilled[:] = vectors
+        spilled.flush()
+    # The mapping stays valid after the file is closed
+    return spilled
+
+
+def _embed_chunks(
+    chunks: Iterable[Document],
+    embedding_model: Embeddings,
+    section_index: SectionIndex,
+    batch_size: int = 64,
+) -> Tuple[np.ndarray, List[str], List[dict]]:
+    """Embed chunks batch by batch, numbering them like ``_upsert_chunks`` does."""
+    vectors, texts, metadatas = [], [], []
+    chunks = iter(chunks)
+    while batch := list(islice(chunks, batch_size)):
+        for chunk in batch:
+            chunk.metadata["chunk_index"] = len(texts)
+            section_index.add(len(texts), chunk.metadata.get("section"))
+            texts.append(chunk.page_content)
+            metadatas.append(chunk.metadata)
+        vectors.append(np.asarray(embedding_model.embed_documents(texts[-len(batch):]), dtype=np.float32))
+    return (np.concatenate(vectors) if vectors else np.empty((0, 0), dtype=np.float32)), texts, metadatas
+
+
+def load_or_build_vector_index(
+    loader,
+    embedding_model: Embeddings,
+    collection_prefix: str,
+    persist_dir: Optional[str] = None,
+    dtype: str = "int8",
+    rescore: bool = True,
+) -> Tuple[QuantizedVectorIndex, dict]:
+    """Quantized counterpart of ``load_or_build_vectorstore``.
+
+    Persisted indexes are stored under ``<persist_dir>/quantized/<name>``
+    and recorded in the same manifest, keyed by a fingerprint that includes
+    the quantization dtype. With ``rescore`` the float32 vectors are saved
+    too and memory-mapped for the rescoring pass; without a ``persist_dir``
+    they go to an anonymous temporary file that is memory-mapped the same
+    way, so the heap only holds the quantized matrix either way.
+    """
+    fingerprint = index_fingerprint(
+        loader.file_path,
+        chunk_size=loader.chunk_size,
+        chunk_overlap=loader.chunk_overlap,
+        metadata=getattr(loader, "metadata", {}),
+        embedding_model=embedding_model_name(embedding_model),
+        index_version=INDEX_VERSION,
+        backend=f"quantized-{dtype}",
+        rescore=rescore,
+    )
+    name = f"{collection_prefix}_{fingerprint[:16]}"
+
+    if persist_dir is not None:
+        root = os.path.join(persist_dir, QUANTIZED_DIR)
+        directory = os.path.join(root, name)
+        manifest = _read_manifest(persist_dir)
+        entry = manifest.get(name)
+        if entry and entry.get("fingerprint") == fingerprint and os.path.isdir(directory):
+            logger.info(f"Reusing quantized vector index {name} ({entry['chunks']} chunks)")
+            return QuantizedVectorIndex.load(directory, embedding_model), entry
+
+    logger.info(f"Building quantized ({dtype}) vector index {name} from {loader.file_path}")
+    started = time.perf_counter()
+    section_index = SectionIndex()
+    full, texts, metadatas = _embed_chunks(loader.iter_chunks(), embedding_model, section_index)
+    _require_chunks(len(texts), loader.file_path)
+    vectors, scales = quantize(full, dtype)
+    index = QuantizedVectorIndex(
+        embedding_model,
+        vectors,
+        scales,
+        texts,
+        metadatas,
+        full_vectors=_spill(_normalize(full)) if rescore else None,
+        collection_name=name,
+    )
+    entry = _manifest_entry(fingerprint, loader.file_path, len(texts), section_index)
+
+    if persist_dir is not None:
+        os.makedirs(root, exist_ok=True)
+        # Drop stale quantized indexes for this filing
+        for stale in os.listdir(root):
+            if stale.startswith(f"{collection_prefix}_") and stale != name:
+                shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
+                manifest.pop(stale, None)
+        index.save(directory)
+        manifest[name] = entry
+        _write_manifest(persist_dir, manifest)
+        # Serve from the memory-mapped files so the float32 copy leaves the heap
+        index = QuantizedVectorIndex.load(directory, embedding_model)
+
+    logger.info(
+        f"Built {name} with {len(texts)} chunks ({index.nbytes / 1e6:.1f} MB resident) "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    return index, entry
@@ -1,4 +1,4 @@
 from .search import tavily_search
-from .analysis import retrieve_information, analyze_financials
+from .analysis import retrieve_information, analyze_financials, set_financial_store
 
-__all__ = ['tavily_search', 'retrieve_information', 'analyze_financials']
\ No newline at end of file
+__all__ = ['tavily_search', 'retrieve_information', 'analyze_financials', 'set_financial_store']
\ No newline at end of file
@@ -1,14 +1,148 @@
-from typing import Annotated
-from langchain_core.tools import tool
-from tavily import TavilyClient
+import asyncio
+import json
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Annotated, Optional
+from langchain_core.tools import StructuredTool
+from tavily import AsyncTavilyClient, TavilyClient
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+# Results per search passed to the agent, and how much of each it sees
+MAX_RESULTS = 5
+SNIPPET_CHARS = 400
+MAX_OUTPUT_CHARS = 3000
 
-@tool
-def tavily_search(query: str) -> str:
+# Pooled keep-alive session shared by all sync searches (and threads)
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"), session=_session)
+
+# One pooled async HTTP client per event loop (an httpx.AsyncClient cannot be
+# shared across loops), reused by every async search on that loop; loop ->
+# (tavily client, its httpx client)
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_tavily_client() -> AsyncTavilyClient:
+    """Return the async Tavily client for the running event loop.
+
+    The agent's async endpoints all run on one long-lived loop (see
+    ``register.AgentFlask``), so they share a single client. Other callers
+    that start their own loop, such as ``asyncio.run`` in scripts and
+    benchmarks, get a client for that loop; close it with
+    ``aclose_async_tavily_client`` before the loop ends.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        http_client = httpx.AsyncClient(
+            base_url="https://api.tavily.com",
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=60,
+        )
+        _async_clients[loop] = (AsyncTavilyClient(api_key=os.getenv("TAVILY_API_KEY"), client=http_client), http_client)
+    return _async_clients[loop][0]
+
+async def aclose_async_tavily_client():
+    """Close the running loop's async client, if it has one."""
+    _, http_client = _async_clients.pop(asyncio.get_running_loop(), (None, None))
+    if http_client is not None:
+        await http_client.aclose()
+
+class SearchCache:
+    """TTL + LRU cache of formatted search results, keyed by normalized query."""
+
+    def __init__(self, ttl_seconds: float = 15 * 60, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(query: str) -> str:
+        return re.sub(r"\s+", " ", query.lower()).strip(" ?.!")
+
+    def get(self, query: str) -> Optional[str]:
+        key = self.key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, query: str, result: str):
+        with self._lock:
+            self._entries[self.key(query)] = (result, time.monotonic())
+            self._entries.move_to_end(self.key(query))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+search_cache = SearchCache()
+
+def _trim(text: str, limit: int) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "..."
+
+def format_results(response: dict) -> str:
+    """Compact JSON of the top results: title, url, date and a trimmed snippet."""
+    results = []
+    size = 2
+    for item in response.get("results", [])[:MAX_RESULTS]:
+        result = {
+            "title": _trim(item.get("title", ""), 150),
+            "url": item.get("url", ""),
+            "date": item.get("published_date"),
+            "snippet": _trim(item.get("content", ""), SNIPPET_CHARS),
+        }
+        result = {key: value for key, value in result.items() if value}
+        encoded = json.dumps(result, ensure_ascii=False)
+        if results and size + len(encoded) + 1 > MAX_OUTPUT_CHARS:
+            break
+        results.append(result)
+        size += len(encoded) + 1
+    return json.dumps(results, ensure_ascii=False)
+
+def search(query: Annotated[str, "search query"]) -> str:
+    """Search for real-time information using Tavily."""
+    cached = search_cache.get(query)
+    if cached is not None:
+        return cached
+    result = format_results(tavily_client.search(query, max_results=MAX_RESULTS))
+    search_cache.put(query, result)
+    return result
+
+async def asearch(query: Annotated[str, "search query"]) -> str:
     """Search for real-time information using Tavily."""
-    result = tavily_client.search(query)
-    return str(result)
\ No newline at end of file
+    cached = search_cache.get(query)
+    if cached is not None:
+        return cached
+    result = format_results(await get_async_tavily_client().search(query, max_results=MAX_RESULTS))
+    search_cache.put(query, result)
+    return result
+
+tavily_search = StructuredTool.from_function(
+    func=search,
+    coroutine=asearch,
+    name="tavily_search",
+    description="Search for real-time information using Tavily. Returns a JSON list of "
+    "results with title, url, date and snippet.",
+)
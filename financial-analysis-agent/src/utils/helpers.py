@@ -3,21 +3,48 @@ from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.output_parsers.openai_functions import JsonOutputFunctionsParser
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 from langchain_openai import ChatOpenAI
+import functools
+from .history import compacted_state
 
-def agent_node(state, agent, name):
-    """Helper function to create agent nodes."""
-    # Add information needed to the state if available
+def _agent_input(state):
+    """Add information needed to the state if available.
+
+    Builds a new message list rather than editing the shared state, which
+    parallel workers read at the same time.
+    """
     if "information_needed" in state:
         message_content = f"""Information needed:
         {', '.join(state['information_needed'])}
         
         Query: {state['messages'][-1].content}"""
-        state['messages'][-1] = HumanMessage(content=message_content)
+        state = {**state, "messages": state["messages"][:-1] + [HumanMessage(content=message_content)]}
+    return state
 
-    result = agent.invoke(state)
+def agent_node(state, agent, name, token_budget=None, workers=None):
+    """Helper function to create agent nodes."""
+    result = agent.invoke(_agent_input(compacted_state(state, token_budget, workers)))
     return {"messages": [HumanMessage(content=result["output"], name=name)]}
 
+async def aagent_node(state, agent, name, token_budget=None, workers=None):
+    """Async agent node: the executor, its LLM calls and tools run without blocking a thread."""
+    result = await agent.ainvoke(_agent_input(compacted_state(state, token_budget, workers)))
+    return {"messages": [HumanMessage(content=result["output"], name=name)]}
+
+def create_agent_node(agent, name, token_budget: Optional[int] = None, workers: Optional[List[str]] = None):
+    """Graph node for an agent with both sync (invoke) and async (ainvoke) paths.
+
+    With a ``token_budget`` the agent sees a compacted view of the history
+    (see ``compact_history``); the graph state keeps every message.
+    """
+    kwargs = {"agent": agent, "name": name, "token_budget": token_budget, "workers": workers}
+    return RunnableLambda(
+        functools.partial(agent_node, **kwargs),
+        afunc=functools.partial(aagent_node, **kwargs),
+        name=name,
+    )
+
 
 def create_agent(
     llm: ChatOpenAI,
@@ -42,9 +69,13 @@ def create_agent(
     executor = AgentExecutor(agent=agent, tools=tools)
     return executor
 
-def create_team_supervisor(llm: ChatOpenAI, system_prompt, members) -> Callable:
-    """Create an LLM-based router with enhanced reasoning."""
-    options = ["FINISH"] + members
+def create_team_supervisor(llm: ChatOpenAI, system_prompt, members, allow_parallel: bool = False) -> Callable:
+    """Create an LLM-based router with enhanced reasoning.
+
+    With ``allow_parallel`` the router can also answer "ALL" to send the
+    task to every member at once.
+    """
+    options = ["FINISH"] + members + (["ALL"] if allow_parallel else [])
     function_def = {
         "name": "route",
         "description": "Select the next role based on query analysis.",
@@ -94,6 +125,12 @@ def create_team_supervisor(llm: ChatOpenAI, system_prompt, members) -> Callable:
     2. Confirmed the response addresses the original query comprehensively
     3. Validated that no additional context is needed
     """
+    if allow_parallel:
+        enhanced_system_prompt += """
+    Select ALL when the query needs information from every worker and they can
+    work independently (e.g. filing figures plus current market data): they run
+    at the same time and you see all of their findings together.
+    """
 
     prompt = ChatPromptTemplate.from_messages([
         ("system", enhanced_system_prompt),
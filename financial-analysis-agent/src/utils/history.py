@@ -0,0 +1,99 @@
+import functools
+from typing import List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+
+# Fixed per-message overhead of the chat format (role, name, separators)
+MESSAGE_OVERHEAD = 4
+
+
+@functools.lru_cache(maxsize=1)
+def _counter():
+    # Imported lazily so the graph does not load tiktoken unless compaction is on
+    from ..rag.splitter import TokenCounter
+    return TokenCounter(num_threads=1, max_entries=10_000)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    return _counter()(message.content) + MESSAGE_OVERHEAD
+
+
+def truncate_message(message: BaseMessage, max_tokens: int, label: str = "truncated") -> BaseMessage:
+    """Copy of ``message`` cut to about ``max_tokens`` tokens, marked as shortened."""
+    encoder = _counter().encoder
+    tokens = encoder.encode(message.content)
+    if len(tokens) + MESSAGE_OVERHEAD <= max_tokens:
+        return message
+    marker = f"\n[... {label}]"
+    keep = max(max_tokens - MESSAGE_OVERHEAD - len(encoder.encode(marker)), 0)
+    return message.copy(update={"content": encoder.decode(tokens[:keep]) + marker})
+
+
+def compact_history(
+    messages: List[BaseMessage],
+    token_budget: int,
+    workers: Optional[List[str]] = None,
+    summary_tokens: int = 120,
+) -> List[BaseMessage]:
+    """Fit a conversation into ``token_budget`` tokens for the next model call.
+
+    The original question and each worker's latest output are always kept.
+    Older turns are kept newest first while they fit, then shortened to
+    their first ``summary_tokens`` tokens, then dropped. If the kept
+    messages alone exceed the budget, the worker outputs are cut down to
+    share what is left after the question. Message order is preserved.
+    """
+    if not messages:
+        return messages
+    counts = [message_tokens(message) for message in messages]
+    if sum(counts) <= token_budget:
+        return messages
+
+    # The question plus the newest message from each worker
+    latest = {}
+    for i, message in enumerate(messages[1:], start=1):
+        name = getattr(message, "name", None)
+        if workers is None or name in workers:
+            latest[name] = i
+    pinned = {0, *latest.values()}
+
+    remaining = token_budget - sum(counts[i] for i in pinned)
+    if remaining < 0:
+        # Even the essentials are too long: share the budget left after the question
+        outputs = sorted(pinned - {0})
+        share = max((token_budget - counts[0]) // max(len(outputs), 1), MESSAGE_OVERHEAD + 1)
+        return [messages[0]] + [truncate_message(messages[i], share) for i in outputs]
+
+    kept = {i: messages[i] for i in pinned}
+    for i in reversed(range(1, len(messages))):
+        if i in pinned:
+            continue
+        if counts[i] <= remaining:
+            kept[i] = messages[i]
+            remaining -= counts[i]
+        elif remaining >= summary_tokens + MESSAGE_OVERHEAD:
+            kept[i] = truncate_message(messages[i], summary_tokens + MESSAGE_OVERHEAD, "earlier turn shortened")
+            remaining -= message_tokens(kept[i])
+    return [kept[i] for i in sorted(kept)]
+
+
+def compacted_state(state: dict, token_budget: Optional[int], workers: Optional[List[str]] = None) -> dict:
+    """The state with its messages compacted; the stored history is left untouched."""
+    if token_budget is None:
+        return state
+    return {**state, "messages": compact_history(state["messages"], token_budget, workers)}
+
+
+def with_compacted_history(runnable: Runnable, token_budget: Optional[int], workers: Optional[List[str]] = None) -> Runnable:
+    """Wrap a node so the model it calls sees at most ``token_budget`` tokens of history."""
+    if token_budget is None:
+        return runnable
+
+    def invoke(state, config):
+        return runnable.invoke(compacted_state(state, token_budget, workers), config=config)
+
+    async def ainvoke(state, config):
+        return await runnable.ainvoke(compacted_state(state, token_budget, workers), config=config)
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=getattr(runnable, "name", None) or "compacted")
@@ -0,0 +1,89 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Bounded job queue drained by a fixed pool of worker threads.
+
+    ``submit`` never blocks: when ``max_depth`` jobs are already waiting it
+    returns False so the caller can shed load (e.g. answer 503) instead of
+    piling up work it cannot finish in time. A job's exceptions are logged
+    and do not stop its worker.
+    """
+
+    def __init__(self, name: str, workers: int = 4, max_depth: int = 100):
+        self.name = name
+        self.workers = workers
+        self.max_depth = max_depth
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Start the workers (once)."""
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"{self.name}-worker-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, job: Callable, *args, **kwargs) -> bool:
+        """Queue ``job(*args, **kwargs)``; False if the queue is full."""
+        try:
+            self._queue.put_nowait((job, args, kwargs, time.monotonic()))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self):
+        while True:
+            job, args, kwargs, queued_at = self._queue.get()
+            with self._lock:
+                self.busy += 1
+            logger.info(f"{self.name} job started after {time.monotonic() - queued_at:.2f}s in queue")
+            failed = False
+            try:
+                job(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"{self.name} job failed: {e}")
+                failed = True
+            with self._lock:
+                self.busy -= 1
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            self._queue.task_done()
+
+    def join(self):
+        """Wait until every queued job has finished."""
+        self._queue.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "depth": self.depth,
+                "max_depth": self.max_depth,
+                "workers": self.workers,
+                "busy": self.busy,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,43 @@
+import asyncio
+import contextvars
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class BackgroundLoop:
+    """One event loop in a daemon thread, shared by the async work of a process.
+
+    ``run`` submits a coroutine from any thread and blocks until it
+    finishes; the coroutine sees the caller's context variables (e.g.
+    Flask's request context). Per-loop resources such as pooled async HTTP
+    clients therefore live as long as the process instead of a single
+    call. The thread starts on first use, and again in a forked child
+    (e.g. a gunicorn worker), which does not inherit it.
+    """
+
+    def __init__(self, name: str = "async-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True).start()
+            return self._loop
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run ``coro`` on the loop and return its result (or raise its exception)."""
+        loop = self.loop
+        context = contextvars.copy_context()
+
+        async def in_context():
+            # create_task copies the current context, so the task runs in the caller's
+            return await context.run(loop.create_task, coro)
+
+        return asyncio.run_coroutine_threadsafe(in_context(), loop).result(timeout)
@@ -0,0 +1,313 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Sequence[Tuple[str, Any]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                labels = list(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_labels(labels + [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time (e.g. a cache hit rate)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            return [f"{self.name} {_number(self.read())}"]
+        except Exception as e:
+            logger.warning(f"Could not read gauge {self.name}: {e}")
+            return []
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, documentation, read))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served by the /metrics endpoint
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "financial_agent_request_seconds", "End-to-end time of a research graph request", ["status"]
+)
+NODE_SECONDS = registry.histogram(
+    "financial_agent_node_seconds", "Wall time per graph node execution", ["node"]
+)
+LLM_SECONDS = registry.histogram(
+    "financial_agent_llm_seconds", "Latency of LLM calls", ["node", "model"]
+)
+LLM_TOKENS = registry.histogram(
+    "financial_agent_llm_tokens", "Tokens per LLM call", ["node", "kind"], buckets=TOKEN_BUCKETS
+)
+REQUEST_TOKENS = registry.histogram(
+    "financial_agent_request_tokens", "LLM tokens per request", ["kind"], buckets=TOKEN_BUCKETS
+)
+TOOL_SECONDS = registry.histogram(
+    "financial_agent_tool_seconds", "Duration of tool calls", ["tool", "status"]
+)
+TOOL_CALLS = registry.histogram(
+    "financial_agent_tool_calls", "Tool calls per request", ["tool"], buckets=(0, 1, 2, 3, 5, 8, 13)
+)
+RETRIEVAL_SECONDS = registry.histogram(
+    "financial_agent_retrieval_seconds", "Duration of vector/keyword retrieval", ["retriever"]
+)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Per-request callback handler feeding the process-wide histograms.
+
+    Pass a fresh instance in the ``callbacks`` of each graph invocation and
+    call ``finish`` when it returns. Besides recording into the histograms,
+    the handler keeps a per-request ``summary()`` (node times, tokens, tool
+    calls, retrieval time) for logging. Safe to share between the parallel
+    workers of one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._runs: Dict[UUID, tuple] = {}
+        self._nodes: Dict[UUID, str] = {}
+        self._lock = threading.Lock()
+        self.node_seconds: Dict[str, float] = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.tool_calls: Dict[str, int] = {}
+        self.tool_seconds: Dict[str, float] = {}
+        self.retrieval_seconds = 0.0
+
+    def _start(self, run_id: UUID, kind: str, name: str, node: str):
+        with self._lock:
+            self._runs[run_id] = (kind, name, node, time.perf_counter())
+
+    def _stop(self, run_id: UUID) -> Optional[tuple]:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        kind, name, node, started = run
+        return kind, name, node, time.perf_counter() - started
+
+    @staticmethod
+    def _node(metadata: Optional[dict]) -> str:
+        return (metadata or {}).get("langgraph_node", "")
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = self._node(metadata)
+        # A node's own run is named after the node; skip runnables nested in it with the same name
+        if not node or kwargs.get("name") != node or node.startswith("__"):
+            return
+        with self._lock:
+            if self._nodes.get(parent_run_id) == node:
+                return
+            self._nodes[run_id] = node
+        self._start(run_id, "node", node, node)
+
+    def _end_chain(self, run_id: UUID):
+        run = self._stop(run_id)
+        if run is None:
+            return
+        with self._lock:
+            self._nodes.pop(run_id, None)
+        _, name, _, seconds = run
+        NODE_SECONDS.observe(seconds, node=name)
+        with self._lock:
+            self.node_seconds[name] = self.node_seconds.get(name, 0.0) + seconds
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        model = (kwargs.get("invocation_params") or {}).get("model") or (kwargs.get("invocation_params") or {}).get("model_name") or ""
+        self._start(run_id, "llm", model, self._node(metadata))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, **kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        run = self._stop(run_id)
+        if run is None:
+            return
+        _, model, node, seconds = run
+        LLM_SECONDS.observe(seconds, node=node, model=model)
+        prompt, completion = self._usage(response)
+        if prompt or completion:
+            LLM_TOKENS.observe(prompt, node=node, kind="prompt")
+            LLM_TOKENS.observe(completion, node=node, kind="completion")
+            with self._lock:
+                self.tokens["prompt"] += prompt
+                self.tokens["completion"] += completion
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._stop(run_id)
+        if run is not None:
+            LLM_SECONDS.observe(run[3], node=run[2], model=run[1])
+
+    @staticmethod
+    def _usage(response: LLMResult) -> Tuple[int, int]:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        prompt = completion = 0
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += metadata.get("input_tokens", 0)
+                completion += metadata.get("output_tokens", 0)
+        return prompt, completion
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name") or "tool", self._node(metadata))
+
+    def _end_tool(self, run_id: UUID, status: str):
+        run = self._stop(run_id)
+        if run is None:
+            return
+        _, tool, _, seconds = run
+        TOOL_SECONDS.observe(seconds, tool=tool, status=status)
+        with self._lock:
+            self.tool_calls[tool] = self.tool_calls.get(tool, 0) + 1
+            self.tool_seconds[tool] = self.tool_seconds.get(tool, 0.0) + seconds
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_tool(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_tool(run_id, "error")
+
+    def on_retriever_start(self, serialized, query, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "retriever", kwargs.get("name") or (serialized or {}).get("name") or "retriever", self._node(metadata))
+
+    def _end_retriever(self, run_id: UUID):
+        run = self._stop(run_id)
+        if run is None:
+            return
+        RETRIEVAL_SECONDS.observe(run[3], retriever=run[1])
+        with self._lock:
+            self.retrieval_seconds += run[3]
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end_retriever(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end_retriever(run_id)
+
+    def finish(self, status: str = "ok") -> dict:
+        """Record the request-level metrics and return the per-request summary."""
+        REQUEST_SECONDS.observe(time.perf_counter() - self.started, status=status)
+        for kind, count in self.tokens.items():
+            REQUEST_TOKENS.observe(count, kind=kind)
+        for tool, count in self.tool_calls.items():
+            TOOL_CALLS.observe(count, tool=tool)
+        summary = self.summary()
+        logger.info(f"Request metrics: {summary}")
+        return summary
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "seconds": round(time.perf_counter() - self.started, 3),
+                "node_seconds": {name: round(s, 3) for name, s in self.node_seconds.items()},
+                "tokens": dict(self.tokens),
+                "tool_calls": dict(self.tool_calls),
+                "tool_seconds": {name: round(s, 3) for name, s in self.tool_seconds.items()},
+                "retrieval_seconds": round(self.retrieval_seconds, 3),
+            }
@@ -7,6 +7,7 @@ const OptimusPrime = () => {
   const [inputText, setInputText] = useState('');
   const [isRecording, setIsRecording] = useState(false);
   const [isProcessing, setIsProcessing] = useState(false);
+  const [elapsed, setElapsed] = useState(0);
   const messagesEndRef = useRef(null);
 
   const scrollToBottom = () => {
@@ -29,48 +30,67 @@ const OptimusPrime = () => {
     setMessages(prev => [...prev, userMessage]);
     setInputText('');
     setIsProcessing(true);
+    setElapsed(0);
 
     try {
         // Send request
-        await fetch('/api/send-request', {
+        const sent = await fetch('/api/send-request', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({ input: inputText }),
         });
+        const { request_id: requestId } = await sent.json();
+        if (!requestId) throw new Error('No request ID returned');
 
-        // Poll for response
-        const pollInterval = setInterval(async () => {
-            try {
-                const responseData = await fetch('/api/get-response');
-                const data = await responseData.json();
-
-                if (data.status !== 'waiting' && data.analysis_result) {
-                    clearInterval(pollInterval);
-                    setIsProcessing(false);
-
-                    // Check if we have the expected data structure
-                    if (data.analysis_result && data.analysis_result.analysis) {
-                        // Add agent responses
-                        data.analysis_result.analysis.forEach(response => {
-                            if (response) {  // Add null check
-                                setMessages(prev => [...prev, {
-                                    type: 'agent',
-                                    agentName: response.name || 'Agent',
-                                    content: response.content || 'No content available',
-                                    timestamp: new Date().toLocaleTimeString()
-                                }]);
-                            }
-                        });
+        // The backend pushes the response for this request when it arrives
+        const events = new EventSource(`/api/events/${requestId}`);
+
+        events.addEventListener('result', (event) => {
+            events.close();
+            setIsProcessing(false);
+            const data = JSON.parse(event.data);
+
+            // Check if we have the expected data structure
+            if (data.analysis_result && data.analysis_result.analysis) {
+                // Add agent responses
+                data.analysis_result.analysis.forEach(response => {
+                    if (response) {  // Add null check
+                        setMessages(prev => [...prev, {
+                            type: 'agent',
+                            agentName: response.name || 'Agent',
+                            content: response.content || 'No content available',
+                            timestamp: new Date().toLocaleTimeString()
+                        }]);
                     }
-                }
-            } catch (error) {
-                clearInterval(pollInterval);
+                });
+            }
+        });
+
+        // Sent while waiting; the agent reports no progress until it answers
+        events.addEventListener('keepalive', (event) => {
+            setElapsed(JSON.parse(event.data).elapsed);
+        });
+
+        // Sent by the backend for unknown or expired requests
+        events.addEventListener('failure', (event) => {
+            events.close();
+            setIsProcessing(false);
+            setMessages(prev => [...prev, {
+                type: 'error',
+                content: JSON.parse(event.data).error,
+                timestamp: new Date().toLocaleTimeString()
+            }]);
+        });
+
+        events.onerror = () => {
+            // EventSource reconnects by itself unless the stream was closed for good
+            if (events.readyState === EventSource.CLOSED) {
                 setIsProcessing(false);
-                console.error('Error polling response:', error);
+                console.error('Response stream closed');
             }
-        }, 1000);
+        };
 
     } catch (error) {
         setIsProcessing(false);
@@ -139,7 +159,7 @@ const OptimusPrime = () => {
                 <div className="flex justify-start">
                   <div className="bg-gray-100 p-3 rounded-lg flex items-center gap-2">
                     <Loader className="w-4 h-4 animate-spin" />
-                    Processing your request...
+                    Processing your request...{elapsed > 0 && ` (waiting ${elapsed}s)`}
                   </div>
                 </div>
               )}
@@ -0,0 +1,29 @@
+"""Gunicorn settings for the financial analysis agent.
+
+Run with ``gunicorn -c gunicorn.conf.py wsgi:app``. Sizes can be overridden
+with ``WEB_CONCURRENCY`` (worker processes), ``GUNICORN_THREADS`` (threads
+per worker) and ``GUNICORN_TIMEOUT`` (seconds).
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5004")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Threads keep SSE streams and async endpoints from tying up a whole process
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Load the app (and the filing index) once in the master, then fork
+preload_app = True
+pythonpath = "financial-analysis-agent"
+
+# Analyses run for minutes
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork(), so each worker starts its own webhook job pool
+    from src.agentverse.register import init_worker
+
+    init_worker()
@@ -1,11 +1,34 @@
 from dotenv import load_dotenv
 from src.rag.chain import create_rag_chain
-from src.graph.state import create_research_graph
+from src.rag.answer_cache import SemanticAnswerCache
+from src.rag.corpus import create_loader
+from src.rag.financials import load_or_build_financial_store
+from src.graph.checkpoint import create_checkpointer
+from src.graph.state import WORKERS, create_research_graph
+from src.agents import FastRouter
+from src.rag.embeddings import HashEmbeddings
+from src.tools.analysis import set_financial_store
+
+# Shared across requests; stats() reports its hit rate
+answer_cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=6 * 3600)
+# Local routing ahead of the LLM supervisor; stats() reports how often it decided
+fast_router = FastRouter(WORKERS, allow_parallel=True, embedding_model=HashEmbeddings(256))
 
 def init_financial_system():
     """Initialize the RAG and research chain"""
-    rag_chain = create_rag_chain("data/raw/apple_10k.pdf")
-    chain = create_research_graph(rag_chain)
+    rag_chain = create_rag_chain(
+        "data/raw",
+        persist_dir="data/processed/vector_store",
+        embedding_cache_path="data/processed/embedding_cache.sqlite",
+        answer_cache=answer_cache,
+        vector_backend="quantized",
+    )
+    set_financial_store(
+        load_or_build_financial_store(create_loader("data/raw"), persist_dir="data/processed")
+    )
+    # Runs are checkpointed per request ID so a retry resumes where it failed
+    checkpointer = create_checkpointer("data/processed/checkpoints.sqlite")
+    chain = create_research_graph(rag_chain, parallel=True, fast_router=fast_router, checkpointer=checkpointer)
     return chain
 
 if __name__ == "__main__":
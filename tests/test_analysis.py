@@ -0,0 +1,29 @@
+import pytest
+
+from src.tools.analysis import DEFAULT_METRICS, _requested_metrics
+
+
+@pytest.mark.parametrize(
+    "query, included, excluded",
+    [
+        ("What was Apple's gross profit in 2024?", {"Gross margin"}, {"Net income", "Net margin"}),
+        ("What is the gross profit margin?", {"Gross margin"}, {"Net margin", "Net income"}),
+        ("How did operating profit change?", {"Operating margin"}, {"Net income"}),
+        ("Operating profit margin trend", {"Operating margin"}, {"Net margin"}),
+        ("Gross profit growth since 2022", {"Gross margin"}, {"Net income growth"}),
+        ("What was net income in 2024?", {"Net income", "Net margin"}, set()),
+        ("What was net profit last year?", {"Net income"}, set()),
+        ("How much profit did Apple make?", {"Net income"}, set()),
+        ("What is the profit margin?", {"Net margin"}, {"Gross margin"}),
+        ("Earnings growth over three years", {"Net income", "Net income growth"}, set()),
+        ("How profitable is the company?", {"Net margin"}, set()),
+    ],
+)
+def test_metric_keywords(query, included, excluded):
+    requested = set(_requested_metrics(query))
+    assert included <= requested
+    assert not excluded & requested
+
+
+def test_unmatched_question_gets_default_metrics():
+    assert _requested_metrics("Give me an overview") == DEFAULT_METRICS
@@ -0,0 +1,142 @@
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from src.rag import answer_cache as answer_cache_module
+from src.rag.answer_cache import SemanticAnswerCache, normalize_question
+from src.rag.embeddings import HashEmbeddings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache_module, "time", clock)
+    return clock
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("embedding_model", HashEmbeddings(256))
+    return SemanticAnswerCache(**kwargs)
+
+
+def test_normalize_question():
+    assert normalize_question("What's  Apple's REVENUE?") == "what s apple s revenue"
+    assert normalize_question("Margin was 46.2%.") == "margin was 46.2%"
+
+
+def test_exact_hit_ignores_case_punctuation_and_spacing():
+    cache = make_cache()
+    cache.store("What is Apple's total revenue?", "391B")
+    answer, _ = cache.lookup("what is apple's   total revenue")
+    assert answer == "391B"
+    assert cache.exact_hits == 1 and cache.semantic_hits == 0
+
+
+def test_semantic_hit_above_threshold_only():
+    cache = make_cache(threshold=0.8)
+    cache.store("What are the main risk factors for Apple", "Supply chain, competition")
+    answer, _ = cache.lookup("What are the main risk factors for Apple Inc")
+    assert answer == "Supply chain, competition"
+    assert cache.semantic_hits == 1
+
+    answer, vector = cache.lookup("How much cash does the company hold")
+    assert answer is None
+    assert vector is not None
+    assert cache.misses == 1
+
+
+def test_questions_with_different_figures_or_filters_never_share():
+    cache = make_cache(threshold=0.5)
+    cache.store("What was revenue in 2023", "383B")
+    assert cache.lookup("What was revenue in 2024")[0] is None
+    assert cache.lookup("What was revenue in 2023")[0] == "383B"
+
+    cache.store("What was revenue", "391B", filters={"ticker": "AAPL"})
+    assert cache.lookup("What was revenue", filters={"ticker": "MSFT"})[0] is None
+    assert cache.lookup("What was revenue", filters={"ticker": "AAPL"})[0] == "391B"
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.store("What was revenue", "391B")
+    clock.now += 59
+    assert cache.lookup("What was revenue")[0] == "391B"
+    clock.now += 2
+    assert cache.lookup("What was revenue")[0] is None
+    # Expired semantic candidates are dropped as well
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2, embedding_model=None)
+    cache.store("first question", "1")
+    cache.store("second question", "2")
+    assert cache.lookup("first question")[0] == "1"
+    cache.store("third question", "3")
+    assert cache.lookup("second question")[0] is None
+    assert cache.lookup("first question")[0] == "1"
+    assert cache.lookup("third question")[0] == "3"
+    assert cache.evictions == 1
+
+
+def test_binding_another_index_clears_the_cache():
+    cache = make_cache()
+    cache.bind_index("build-1")
+    cache.store("What was revenue", "391B")
+    cache.bind_index("build-1")
+    assert cache.lookup("What was revenue")[0] == "391B"
+    cache.bind_index("build-2")
+    assert cache.lookup("What was revenue")[0] is None
+
+
+def test_concurrent_identical_questions_run_the_chain_once():
+    cache = make_cache()
+    release = threading.Event()
+    calls = []
+
+    def answer(question):
+        calls.append(question)
+        release.wait(5)
+        return f"answer to {question}"
+
+    chain = cache.wrap(RunnableLambda(answer), lambda inputs: (inputs, None))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(chain.invoke("What was revenue"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.shared < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["What was revenue"]
+    assert results == ["answer to What was revenue"] * 4
+    assert cache.shared == 3
+    # Later askers are served from the stored answer
+    assert chain.invoke("What was revenue") == "answer to What was revenue"
+    assert len(calls) == 1
+
+
+def test_failed_answer_is_not_cached():
+    cache = make_cache()
+
+    def fail(question):
+        raise RuntimeError("provider down")
+
+    chain = cache.wrap(RunnableLambda(fail), lambda inputs: (inputs, None))
+    with pytest.raises(RuntimeError):
+        chain.invoke("What was revenue")
+    assert cache.stats()["entries"] == 0
+    assert not cache._inflight
@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from benchmarks.fakes import FakeChatModel, fake_tavily
+from src.graph.checkpoint import create_checkpointer
+from src.graph.state import create_research_graph, invoke_research
+
+QUESTION = "What was Apple's revenue in fiscal 2024 and how do analysts see the stock today?"
+
+
+@pytest.fixture(autouse=True)
+def offline_search():
+    with fake_tavily():
+        yield
+
+
+@pytest.fixture
+def rag_chain():
+    return RunnableLambda(lambda question: "Total net sales were $391,035 million in fiscal 2024.")
+
+
+def make_graph(rag_chain, llm, checkpointer=None):
+    return create_research_graph(rag_chain, llm=llm, history_token_budget=None, checkpointer=checkpointer)
+
+
+def worker_answers(result):
+    return [message.name for message in result["messages"][1:]]
+
+
+def test_failed_run_resumes_from_its_last_step(rag_chain, tmp_path):
+    clean = FakeChatModel()
+    expected = invoke_research(make_graph(rag_chain, clean), QUESTION)
+    assert worker_answers(expected) == ["Search", "SECAnalyst"]
+
+    checkpointer = create_checkpointer(str(tmp_path / "checkpoints.sqlite"))
+    # Fail partway through the run, after the first worker has answered
+    flaky = FakeChatModel(fail_every=clean.calls - 1)
+    graph = make_graph(rag_chain, flaky, checkpointer)
+    with pytest.raises(ConnectionError):
+        invoke_research(graph, QUESTION, "run-1", retries=0)
+    failed_at = flaky.calls
+    saved = graph.get_state({"configurable": {"thread_id": "run-1"}})
+    assert saved.next and worker_answers(saved.values) == ["Search"]
+
+    # The retry continues from the checkpoint instead of starting over
+    flaky.fail_every = 0
+    result = invoke_research(graph, QUESTION, "run-1")
+    assert worker_answers(result) == worker_answers(expected)
+    assert flaky.calls - failed_at < clean.calls
+
+    # A finished run returns its stored result without calling the model
+    calls = flaky.calls
+    assert invoke_research(graph, QUESTION, "run-1")["messages"] == result["messages"]
+    assert flaky.calls == calls
+
+
+def test_retries_resume_in_place(rag_chain, tmp_path):
+    flaky = FakeChatModel(fail_every=4)
+    graph = make_graph(rag_chain, flaky, create_checkpointer(str(tmp_path / "checkpoints.sqlite")))
+    result = invoke_research(graph, QUESTION, "run-2", retries=5)
+    assert worker_answers(result) == ["Search", "SECAnalyst"]
+    assert flaky.calls // 4 >= 2
+
+
+def test_request_id_cannot_be_reused_for_another_query(rag_chain, tmp_path):
+    graph = make_graph(rag_chain, FakeChatModel(), create_checkpointer(str(tmp_path / "checkpoints.sqlite")))
+    invoke_research(graph, QUESTION, "run-3")
+    with pytest.raises(ValueError):
+        invoke_research(graph, "Another question", "run-3")
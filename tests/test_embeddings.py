@@ -0,0 +1,149 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.rag.embeddings import CachedEmbeddings, HashEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    """HashEmbeddings that records each request and can be held open."""
+
+    def __init__(self, latency=0.0):
+        self.inner = HashEmbeddings(64)
+        self.model = self.inner.model
+        self.latency = latency
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(("documents", list(texts)))
+        time.sleep(self.latency)
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.requests.append(("query", text))
+        time.sleep(self.latency)
+        return self.inner.embed_query(text)
+
+
+@pytest.fixture
+def underlying():
+    return RecordingEmbeddings()
+
+
+@pytest.fixture
+def cached(underlying, tmp_path):
+    return CachedEmbeddings(underlying, str(tmp_path / "embeddings.sqlite"), wave_window=0.05)
+
+
+def in_threads(function, texts):
+    """Call ``function(text)`` for each text on its own thread, in a copy of the caller's context."""
+    run_threads([
+        lambda context=contextvars.copy_context(), text=text: context.run(function, text) for text in texts
+    ])
+
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_documents_are_embedded_once(cached, underlying):
+    first = cached.embed_documents(["a", "b", "a"])
+    assert cached.embed_documents(["b", "c"]) == [first[1], cached.embed_documents(["c"])[0]]
+    assert underlying.requests == [("documents", ["a", "b"]), ("documents", ["c"])]
+    assert (cached.hits, cached.misses) == (3, 3)
+
+
+def test_queries_in_a_coalesce_block_share_one_request(cached, underlying):
+    results = {}
+
+    def query(text):
+        results[text] = cached.embed_query(text)
+
+    with cached.coalesce():
+        in_threads(query, ["q1", "q2", "q3"])
+    assert len(underlying.requests) == 1
+    kind, texts = underlying.requests[0]
+    assert kind == "documents" and sorted(texts) == ["q1", "q2", "q3"]
+    assert cached.query_waves == 1
+    assert results["q2"] == HashEmbeddings(64).embed_query("q2")
+
+
+def test_coalescing_is_scoped_to_the_block(cached, underlying):
+    started = threading.Event()
+    outside = {}
+
+    def unrelated():
+        # A concurrent query from outside the block must not wait for a wave
+        started.wait()
+        began = time.monotonic()
+        cached.embed_query("unrelated")
+        outside["seconds"] = time.monotonic() - began
+
+    def batch():
+        with cached.coalesce():
+            started.set()
+            cached.embed_query("batched")
+
+    run_threads([batch, unrelated])
+    assert ("query", "unrelated") in underlying.requests
+    assert ("documents", ["batched"]) in underlying.requests
+    assert outside["seconds"] < cached.wave_window
+    assert cached.query_waves == 1
+
+
+def test_async_queries_coalesce_within_the_block(cached, underlying):
+    async def main():
+        with cached.coalesce():
+            await asyncio.gather(*[cached.aembed_query(f"q{i}") for i in range(4)])
+        await cached.aembed_query("after")
+
+    asyncio.run(main())
+    assert len(underlying.requests) == 2
+    assert sorted(underlying.requests[0][1]) == ["q0", "q1", "q2", "q3"]
+    assert underlying.requests[1] == ("query", "after")
+
+
+def test_failed_wave_raises_for_every_query(cached, underlying):
+    underlying.embed_documents = lambda texts: (_ for _ in ()).throw(ConnectionError("down"))
+    errors = []
+
+    def query(text):
+        try:
+            cached.embed_query(text)
+        except ConnectionError as e:
+            errors.append(e)
+
+    with cached.coalesce():
+        in_threads(query, ["q1", "q2"])
+    assert len(errors) == 2
+
+
+def test_cache_hits_do_not_wait_for_a_slow_request(cached, underlying):
+    cached.embed_documents(["cached"])
+    underlying.latency = 0.5
+    started = threading.Event()
+    timings = {}
+
+    def slow():
+        started.set()
+        cached.embed_documents(["new"])
+
+    def hit():
+        started.wait()
+        time.sleep(0.05)
+        began = time.monotonic()
+        cached.embed_documents(["cached"])
+        timings["hit"] = time.monotonic() - began
+
+    run_threads([slow, hit])
+    assert timings["hit"] < 0.25
+    assert cached.embed_documents(["new"]) == HashEmbeddings(64).embed_documents(["new"])
+    assert underlying.requests.count(("documents", ["new"])) == 1
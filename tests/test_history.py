@@ -0,0 +1,102 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fakes import local_tokenizer
+from src.utils import history
+from src.utils.history import MESSAGE_OVERHEAD, compact_history, message_tokens
+
+WORKERS = ["Search", "SECAnalyst"]
+
+
+@pytest.fixture(autouse=True)
+def tokenizer():
+    # The local stand-in needs no BPE download; counts are still per token
+    with local_tokenizer():
+        history._counter.cache_clear()
+        yield
+    history._counter.cache_clear()
+
+
+def turn(name, words, tag):
+    return HumanMessage(content=" ".join(f"{tag}{i}" for i in range(words)), name=name)
+
+
+def conversation():
+    return [
+        HumanMessage(content="Compare Apple's 10-K revenue with its current stock price"),
+        turn("SECAnalyst", 300, "a"),
+        turn("Search", 200, "b"),
+        turn("SECAnalyst", 250, "c"),
+        turn("Search", 150, "d"),
+        turn("SECAnalyst", 80, "e"),
+    ]
+
+
+def total(messages):
+    return sum(message_tokens(message) for message in messages)
+
+
+def positions(compacted, messages):
+    """Index in ``messages`` of each compacted message (shortened copies keep their name and prefix)."""
+    found = []
+    for message in compacted:
+        found.append(next(
+            i for i, original in enumerate(messages)
+            if original.name == message.name and original.content.startswith(message.content.split("\n[...")[0])
+        ))
+    return found
+
+
+def test_under_budget_is_unchanged():
+    messages = conversation()
+    assert compact_history(messages, total(messages)) is messages
+    assert compact_history([], 10) == []
+
+
+@pytest.mark.parametrize("budget_share", [0.9, 0.7, 0.5, 0.35])
+def test_fits_budget_keeping_question_and_latest_outputs(budget_share):
+    messages = conversation()
+    budget = int(total(messages) * budget_share)
+    compacted = compact_history(messages, budget, WORKERS)
+
+    assert total(compacted) <= budget
+    assert compacted[0] is messages[0]
+    assert messages[4] in compacted and messages[5] in compacted
+    order = positions(compacted, messages)
+    assert order == sorted(set(order))
+
+
+def test_older_turns_are_shortened_before_dropped():
+    messages = conversation()
+    essentials = total([messages[0], messages[4], messages[5]])
+    compacted = compact_history(messages, essentials + 150, WORKERS, summary_tokens=120)
+    shortened = [m for m in compacted if m.content.endswith("[... earlier turn shortened]")]
+    assert len(shortened) == 1
+    assert shortened[0].content.startswith("c0 c1")
+    assert message_tokens(shortened[0]) <= 120 + MESSAGE_OVERHEAD
+    assert [m.name for m in compacted] == [None, "SECAnalyst", "Search", "SECAnalyst"]
+
+    # Too little room for even a summary: older turns are dropped
+    compacted = compact_history(messages, essentials + 50, WORKERS, summary_tokens=120)
+    assert compacted == [messages[0], messages[4], messages[5]]
+
+
+def test_oversized_outputs_share_the_remaining_budget():
+    messages = [HumanMessage(content="What was revenue?"), turn("SECAnalyst", 500, "a"), turn("Search", 500, "b")]
+    budget = 400
+    compacted = compact_history(messages, budget, WORKERS)
+
+    assert compacted[0] is messages[0]
+    assert [m.name for m in compacted[1:]] == ["SECAnalyst", "Search"]
+    share = (budget - message_tokens(messages[0])) // 2
+    for message in compacted[1:]:
+        assert message.content.endswith("[... truncated]")
+        assert message_tokens(message) <= share
+    assert total(compacted) <= budget
+
+
+def test_messages_from_non_workers_are_not_pinned():
+    messages = conversation() + [HumanMessage(content="x " * 400, name="Reviewer")]
+    budget = total(messages[:1] + messages[4:6])
+    compacted = compact_history(messages, budget, WORKERS)
+    assert compacted == [messages[0], messages[4], messages[5]]
@@ -0,0 +1,54 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.rag.embeddings import HashEmbeddings
+from src.rag.index import _read_manifest, load_or_build_vectorstore
+from src.rag.vector_index import load_or_build_vector_index
+
+
+class StubLoader:
+    """Loader yielding fixed chunks, like DocumentLoader.iter_chunks."""
+
+    def __init__(self, texts, file_path="filing.pdf"):
+        self.texts = texts
+        self.file_path = file_path
+        self.chunk_size = 300
+        self.chunk_overlap = 0
+        self.metadata = {"ticker": "AAPL"}
+
+    def iter_chunks(self):
+        for i, text in enumerate(self.texts):
+            yield Document(page_content=text, metadata={"page": i, "section": "Item 7" if i else "Cover"})
+
+
+@pytest.fixture
+def filing(tmp_path):
+    path = tmp_path / "filing.pdf"
+    path.write_bytes(b"%PDF-1.4 stand-in")
+    return str(path)
+
+
+@pytest.mark.parametrize("build", [load_or_build_vectorstore, load_or_build_vector_index])
+def test_builds_and_reuses_persisted_index(build, filing, tmp_path):
+    persist_dir = str(tmp_path / "index")
+    loader = StubLoader(["Apple Inc. annual report", "Net sales were $391,035 million"], filing)
+    store, entry = build(loader, HashEmbeddings(64), "apple", persist_dir=persist_dir)
+    assert entry["chunks"] == 2
+    assert entry["sections"] == {"Cover": [[0, 1]], "Item 7": [[1, 2]]}
+    assert store.similarity_search("net sales", k=1)[0].metadata["chunk_index"] == 1
+    if hasattr(store, "client"):
+        # Local Qdrant locks its folder to one client
+        store.client.close()
+
+    reused, _ = build(StubLoader([], filing), HashEmbeddings(64), "apple", persist_dir=persist_dir)
+    assert reused.similarity_search("net sales", k=1)[0].page_content == "Net sales were $391,035 million"
+
+
+@pytest.mark.parametrize("build", [load_or_build_vectorstore, load_or_build_vector_index])
+@pytest.mark.parametrize("persist", [True, False])
+def test_filing_without_chunks_is_rejected_before_the_manifest(build, persist, filing, tmp_path):
+    persist_dir = str(tmp_path / "index") if persist else None
+    with pytest.raises(ValueError, match="No text could be extracted"):
+        build(StubLoader([], filing), HashEmbeddings(64), "apple", persist_dir=persist_dir)
+    if persist:
+        assert _read_manifest(persist_dir) == {}
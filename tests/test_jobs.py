@@ -0,0 +1,52 @@
+import threading
+
+from src.utils.jobs import JobQueue
+
+
+def test_full_queue_rejects_without_blocking():
+    jobs = JobQueue("test", workers=1, max_depth=2)
+    assert jobs.submit(print) and jobs.submit(print)
+    assert not jobs.submit(print)
+    assert not jobs.submit(print)
+    assert jobs.stats()["depth"] == 2
+    assert jobs.stats()["rejected"] == 2
+
+
+def test_busy_workers_leave_room_for_max_depth_waiting_jobs():
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def job():
+        started.release()
+        release.wait(5)
+
+    jobs = JobQueue("test", workers=2, max_depth=1)
+    jobs.start()
+    assert jobs.submit(job) and started.acquire(timeout=5)
+    assert jobs.submit(job) and started.acquire(timeout=5)
+    assert jobs.submit(job)
+    assert not jobs.submit(job)
+    assert jobs.stats()["busy"] == 2
+
+    release.set()
+    jobs.join()
+    assert jobs.stats() == {
+        "depth": 0, "max_depth": 1, "workers": 2, "busy": 0, "completed": 3, "failed": 0, "rejected": 1,
+    }
+
+
+def test_failed_job_does_not_stop_its_worker():
+    results = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    jobs = JobQueue("test", workers=1, max_depth=10)
+    jobs.start()
+    jobs.start()
+    jobs.submit(fail)
+    jobs.submit(results.append, "after")
+    jobs.join()
+    assert results == ["after"]
+    assert jobs.stats()["failed"] == 1 and jobs.stats()["completed"] == 1
+    assert len(jobs._threads) == 1
@@ -0,0 +1,116 @@
+import math
+
+import pytest
+from langchain_core.documents import Document
+
+from src.rag.corpus import build_qdrant_filter
+from src.rag.embeddings import HashEmbeddings
+from src.rag.keyword_index import HybridRetriever, KeywordIndex, tokenize
+from src.rag.vector_index import QuantizedVectorIndex
+
+TEXTS = [
+    "Total net sales were $391,035 million in 2024.",
+    "iPhone net sales decreased due to lower sales in Greater China.",
+    "Services gross margin increased to 74.0 percent.",
+    "Research and development expense grew to $31,370 million.",
+    "The Company's products face intense competition.",
+]
+
+
+@pytest.fixture
+def documents():
+    return [
+        Document(page_content=text, metadata={"chunk_index": i, "fiscal_year": 2024 if i < 3 else 2023})
+        for i, text in enumerate(TEXTS)
+    ]
+
+
+def bm25(documents, query, k1=1.5, b=0.75):
+    """Textbook BM25 with the same idf as the index, for comparison."""
+    docs = [tokenize(doc.page_content) for doc in documents]
+    average = sum(map(len, docs)) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if not tf:
+                continue
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            score += tokenize(query).count(term) * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / average))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_keeps_figures_and_folds_plurals():
+    assert tokenize("Net sales of $391,035 million") == ["net", "sale", "391035", "million"]
+    assert tokenize("The Company's margins, 46.2%") == ["company", "margin", "46.2"]
+
+
+def test_scores_match_reference_bm25(documents):
+    index = KeywordIndex.from_documents(documents)
+    for query in ("net sales", "sales in China", "391,035", "gross margin percent"):
+        assert index.scores(query).tolist() == pytest.approx(bm25(documents, query), rel=1e-5)
+
+
+def test_search_ranks_by_score_and_skips_non_matches(documents):
+    index = KeywordIndex.from_documents(documents)
+    hits = index.search("net sales", k=4)
+    assert [doc.metadata["chunk_index"] for doc, _ in hits] == [1, 0]
+    assert hits[0][1] > hits[1][1] > 0
+
+    assert index.search("net sales", k=1)[0][0].metadata["chunk_index"] == 1
+    assert index.search("dividends") == []
+
+
+def test_search_applies_metadata_filter(documents):
+    index = KeywordIndex.from_documents(documents)
+    hits = index.search("million", filter=build_qdrant_filter({"fiscal_year": 2023}))
+    assert [doc.metadata["chunk_index"] for doc, _ in hits] == [3]
+    assert index.search("net sales", filter=build_qdrant_filter({"fiscal_year": [2023]})) == []
+
+
+def test_save_and_load_round_trip(documents, tmp_path):
+    index = KeywordIndex.from_documents(documents)
+    path = str(tmp_path / "keywords.npz")
+    index.save(path)
+    loaded = KeywordIndex.load(path)
+    assert loaded.scores("gross margin").tolist() == index.scores("gross margin").tolist()
+    assert loaded.document(2) == index.document(2)
+
+
+def test_empty_index():
+    index = KeywordIndex.from_documents([])
+    assert len(index) == 0
+    assert index.search("revenue") == []
+
+
+def make_retriever(documents, **kwargs):
+    vectorstore = QuantizedVectorIndex.from_texts(
+        [doc.page_content for doc in documents], HashEmbeddings(128), [doc.metadata for doc in documents]
+    )
+    return HybridRetriever(vectorstore=vectorstore, keyword_index=KeywordIndex.from_documents(documents), **kwargs)
+
+
+def test_rrf_fuses_ranks_from_both_sides(documents):
+    retriever = make_retriever(documents, rrf_k=60)
+    d = documents
+    # 1 is ranked by both sides; 0 tops the vector side, 3 the keyword side
+    fused = retriever._fuse([d[0], d[1], d[2]], [d[3], d[1], d[4]], k=5)
+    assert [doc.metadata["chunk_index"] for doc in fused] == [1, 0, 3, 2, 4]
+
+    # Weights shift ties between the two sides
+    retriever.keyword_weight = 2.0
+    fused = retriever._fuse([d[0], d[1], d[2]], [d[3], d[1], d[4]], k=3)
+    assert [doc.metadata["chunk_index"] for doc in fused] == [1, 3, 4]
+
+
+def test_hybrid_retriever_returns_top_k_under_filter(documents):
+    retriever = make_retriever(
+        documents, search_kwargs={"k": 2, "filter": build_qdrant_filter({"fiscal_year": 2024})}
+    )
+    results = retriever.invoke("net sales 391,035")
+    assert len(results) == 2
+    assert all(doc.metadata["fiscal_year"] == 2024 for doc in results)
+    assert results[0].metadata["chunk_index"] == 0
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from benchmarks.fakes import local_tokenizer
+from src.rag.loader import DocumentLoader
+
+FILING = os.path.join(os.path.dirname(__file__), "..", "data", "raw", "apple_10k.pdf")
+
+
+@pytest.fixture(autouse=True)
+def tokenizer():
+    # Worker processes are forked, so they inherit the stand-in tokenizer
+    with local_tokenizer():
+        yield
+
+
+def chunks(documents):
+    return [(doc.page_content, doc.metadata["page"], doc.metadata["section"], doc.metadata["ticker"]) for doc in documents]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_streamed_chunks_match_load_and_split(workers):
+    loader = DocumentLoader(FILING, metadata={"ticker": "AAPL"})
+    expected = chunks(DocumentLoader(FILING, metadata={"ticker": "AAPL"}).load_and_split())
+    assert chunks(loader.iter_chunks(workers=workers, pages_per_task=8, max_pending=2)) == expected
+    assert {section for _, _, section, _ in expected} >= {"Cover", "Item 1A", "Item 7", "Item 8", "Exhibits"}
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fetchai")
+pytest.importorskip("flask_cors")
+
+from backend import app as app_module  # noqa: E402
+from backend.app import ResponseStore  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(app_module, "time", clock)
+    return clock
+
+
+def test_response_is_collected_once():
+    store = ResponseStore()
+    store.register("a")
+    assert store.pop("a") == ("waiting", None)
+    assert store.put("a", {"answer": 1})
+    assert store.pop("a") == ("ready", {"answer": 1})
+    assert store.pop("a") == ("unknown", None)
+    assert not store.put("never-registered", {})
+
+
+def test_entries_expire_after_ttl(clock):
+    store = ResponseStore(ttl_seconds=60)
+    store.register("old")
+    clock.now += 30
+    store.register("new")
+    store.put("new", "answer")
+
+    clock.now += 31
+    assert not store.put("old", "late answer")
+    assert store.pop("old") == ("unknown", None)
+    assert store.pop("new") == ("ready", "answer")
+
+
+def test_oldest_entries_dropped_beyond_max_entries():
+    store = ResponseStore(max_entries=3)
+    for request_id in "abcd":
+        store.register(request_id)
+    assert store.pop("a") == ("unknown", None)
+    assert [store.pop(request_id)[0] for request_id in "bcd"] == ["waiting"] * 3
+
+
+def test_discard_forgets_request_and_wakes_waiters():
+    store = ResponseStore()
+    store.register("a")
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(store.wait("a", timeout=5)))
+    waiter.start()
+    time.sleep(0.05)
+    store.discard("a")
+    waiter.join(timeout=1)
+    assert result == [("unknown", None)]
+    store.discard("missing")
+
+
+def test_wait_returns_as_soon_as_response_arrives():
+    store = ResponseStore()
+    store.register("a")
+    threading.Timer(0.05, store.put, args=("a", "answer")).start()
+    started = time.monotonic()
+    assert store.wait("a", timeout=5) == ("ready", "answer")
+    assert time.monotonic() - started < 1
+
+
+def test_wait_times_out_while_pending():
+    store = ResponseStore()
+    store.register("a")
+    started = time.monotonic()
+    assert store.wait("a", timeout=0.1) == ("waiting", None)
+    assert 0.1 <= time.monotonic() - started < 1
+    assert store.wait("unknown", timeout=5) == ("unknown", None)
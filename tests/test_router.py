@@ -0,0 +1,101 @@
+import pytest
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.agents.router import FastRouter, answer_covers_query
+from src.rag.embeddings import HashEmbeddings
+
+MEMBERS = ["Search", "SECAnalyst"]
+
+
+def state(question, *answers):
+    messages = [HumanMessage(content=question)]
+    messages += [HumanMessage(content=content, name=name) for name, content in answers]
+    return {"messages": messages}
+
+
+@pytest.mark.parametrize(
+    "question, route",
+    [
+        ("What was Apple's net income in fiscal 2024?", "SECAnalyst"),
+        ("Summarize the risk factors in the 10-K", "SECAnalyst"),
+        ("What is the current stock price of AAPL?", "Search"),
+        ("What do analysts say about the latest iPhone news?", "Search"),
+    ],
+)
+def test_single_source_questions_route_locally(question, route):
+    router = FastRouter(MEMBERS)
+    assert router.decide(state(question))["next"] == route
+    assert router.fast_routes == 1
+
+
+def test_questions_needing_both_sources():
+    question = "Compare the 10-K revenue with the current stock price"
+    assert FastRouter(MEMBERS).decide(state(question)) is None
+    assert FastRouter(MEMBERS, allow_parallel=True).decide(state(question))["next"] == "ALL"
+
+
+def test_unplaceable_question_falls_through():
+    assert FastRouter(MEMBERS).decide(state("Tell me about Apple")) is None
+
+
+@pytest.mark.parametrize(
+    "content, covered",
+    [
+        ("Net income was $93.7 billion in fiscal 2024.", True),
+        ("1. Answer: $93.7B\n2. Additional Context Needed: None", True),
+        ("1. Answer: $93.7B\n2. **Additional Context Needed:** [N/A]", True),
+        ("1. Answer: $93.7B\n2. Additional Context Needed: the latest analyst ratings", False),
+        ("I could not find the segment breakdown in the filing.", False),
+        ("This figure is not disclosed in the 10-K.", False),
+        ("   ", False),
+    ],
+)
+def test_gap_detection(content, covered):
+    assert answer_covers_query(content) is covered
+
+
+def test_finish_once_needed_workers_answered_without_gaps():
+    router = FastRouter(MEMBERS)
+    question = "What was net income in fiscal 2024?"
+    assert router.decide(state(question, ("SECAnalyst", "Net income was $93.7 billion."))) == {
+        "next": "FINISH",
+        "reasoning": "Workers answered the question in full",
+        "information_needed": [],
+    }
+    assert router.fast_finishes == 1
+
+    # A gap in the answer, or a needed worker not yet heard from, defers to the supervisor
+    assert router.decide(state(question, ("SECAnalyst", "Net income is not available."))) is None
+    both = "Compare the 10-K revenue with the current stock price"
+    assert router.decide(state(both, ("SECAnalyst", "Revenue was $391B."))) is None
+    assert router.decide(state(both, ("SECAnalyst", "Revenue was $391B."), ("Search", "AAPL trades at $230.")))["next"] == "FINISH"
+
+
+def test_latest_answer_from_each_worker_counts():
+    router = FastRouter(MEMBERS)
+    question = "What was net income in fiscal 2024?"
+    answers = [("SECAnalyst", "I could not find it."), ("SECAnalyst", "Net income was $93.7 billion.")]
+    assert router.decide(state(question, *answers))["next"] == "FINISH"
+    assert router.decide(state(question, *answers[::-1])) is None
+
+
+def test_wrapped_supervisor_learns_and_recalls_routes():
+    calls = []
+
+    def supervisor(state):
+        calls.append(state)
+        return {"next": "Search", "reasoning": "", "information_needed": []}
+
+    router = FastRouter(MEMBERS, embedding_model=HashEmbeddings(256), threshold=0.9)
+    node = router.wrap(RunnableLambda(supervisor))
+
+    question = "Tell me how Apple is doing"
+    assert node.invoke(state(question))["next"] == "Search"
+    assert node.invoke(state(question))["next"] == "Search"
+    assert len(calls) == 1
+    assert router.stats() == {"fast_routes": 1, "fast_finishes": 0, "llm_calls": 1, "examples": 1}
+
+    # Routes outside the team are not remembered
+    router.learn("Say hello", "FINISH")
+    assert router.stats()["examples"] == 1
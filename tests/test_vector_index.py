@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from src.rag.corpus import build_qdrant_filter
+from src.rag.embeddings import HashEmbeddings
+from src.rag.vector_index import QuantizedVectorIndex, _normalize, quantize
+
+DIM = 64
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).standard_normal((500, DIM)).astype(np.float32)
+
+
+def make_index(vectors, dtype="int8", rescore=True, metadatas=None):
+    quantized, scales = quantize(vectors, dtype)
+    return QuantizedVectorIndex(
+        HashEmbeddings(DIM),
+        quantized,
+        scales,
+        [f"chunk {i}" for i in range(len(vectors))],
+        metadatas or [{"chunk_index": i} for i in range(len(vectors))],
+        full_vectors=_normalize(vectors) if rescore else None,
+    )
+
+
+def brute_force(vectors, query, k, rows=None):
+    scores = _normalize(vectors) @ _normalize(query)
+    if rows is not None:
+        scores = np.where(np.isin(np.arange(len(vectors)), rows), scores, -np.inf)
+    return list(np.argsort(-scores, kind="stable")[:k])
+
+
+def test_quantize_round_trips_within_int8_precision(vectors):
+    quantized, scales = quantize(vectors)
+    assert quantized.dtype == np.int8
+    restored = quantized.astype(np.float32) * scales[:, None]
+    assert np.abs(restored - _normalize(vectors)).max() <= scales.max() / 2 + 1e-6
+
+    half, ones = quantize(vectors, "float16")
+    assert half.dtype == np.float16 and np.all(ones == 1)
+    with pytest.raises(ValueError):
+        quantize(vectors, "int4")
+
+
+def test_rescored_top_k_matches_float32_brute_force(vectors):
+    index = make_index(vectors)
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        hits = index.search_by_vector(query, k=10)
+        assert [row for row, _ in hits] == brute_force(vectors, query, 10)
+        expected = _normalize(vectors)[[row for row, _ in hits]] @ _normalize(query)
+        assert np.allclose([score for _, score in hits], expected, atol=1e-5)
+
+
+def test_quantized_top_k_without_rescore_is_close(vectors):
+    index = make_index(vectors, rescore=False)
+    rng = np.random.default_rng(2)
+    overlap = []
+    for _ in range(20):
+        query = rng.standard_normal(DIM).astype(np.float32)
+        hits = [row for row, _ in index.search_by_vector(query, k=10)]
+        scores = [score for _, score in index.search_by_vector(query, k=10)]
+        assert scores == sorted(scores, reverse=True)
+        overlap.append(len(set(hits) & set(brute_force(vectors, query, 10))) / 10)
+    assert np.mean(overlap) >= 0.9
+
+
+def test_filter_mask_excludes_rows(vectors):
+    metadatas = [{"ticker": "AAPL" if i % 3 else "MSFT", "fiscal_year": 2023 + i % 2} for i in range(len(vectors))]
+    index = make_index(vectors, metadatas=metadatas)
+    query = np.random.default_rng(3).standard_normal(DIM).astype(np.float32)
+
+    filter = build_qdrant_filter({"ticker": "MSFT", "fiscal_year": [2024]})
+    rows = [i for i, m in enumerate(metadatas) if m["ticker"] == "MSFT" and m["fiscal_year"] == 2024]
+    hits = [row for row, _ in index.search_by_vector(query, k=5, filter=filter)]
+    assert hits == brute_force(vectors, query, 5, rows)
+
+    assert index.search_by_vector(query, k=5, filter=build_qdrant_filter({"ticker": "TSLA"})) == []
+
+
+def test_k_larger_than_matching_rows_returns_them_all(vectors):
+    index = make_index(vectors[:3])
+    assert len(index.search_by_vector(vectors[0], k=10)) == 3
+
+
+def test_empty_index_and_non_positive_k(vectors):
+    empty = QuantizedVectorIndex.from_texts([], HashEmbeddings(DIM), keep_full=True)
+    assert len(empty) == 0
+    assert empty.search_by_vector([1.0] * DIM, k=4) == []
+    assert empty.similarity_search("revenue") == []
+
+    index = make_index(vectors)
+    assert index.search_by_vector(vectors[0], k=0) == []
+    assert index.search_by_vector(vectors[0], k=-1) == []
+
+
+def test_nbytes_counts_in_memory_full_vectors_only(vectors, tmp_path):
+    index = make_index(vectors)
+    quantized_bytes = index.vectors.nbytes + index.scales.nbytes
+    assert index.nbytes == quantized_bytes + index.full_vectors.nbytes
+
+    index.save(str(tmp_path / "index"))
+    loaded = QuantizedVectorIndex.load(str(tmp_path / "index"), HashEmbeddings(DIM))
+    assert isinstance(loaded.full_vectors, np.memmap)
+    assert loaded.nbytes == quantized_bytes
+    assert loaded.search_by_vector(vectors[7], k=3) == index.search_by_vector(vectors[7], k=3)
@@ -0,0 +1,20 @@
+"""WSGI entry point for multi-process serving: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+With ``preload_app`` (see gunicorn.conf.py) this module is imported once in
+the gunicorn master: the filing index is built or loaded and the agent
+registered before the workers fork. Every worker then reads the same index
+pages (memory-mapped vectors, copy-on-write arrays) instead of loading its
+own copy.
+"""
+import gc
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.agentverse.register import flask_app as app, init_agent  # noqa: E402
+
+init_agent()
+
+# Keep the cyclic GC in the workers from touching (and so copying) the preloaded objects
+gc.freeze()